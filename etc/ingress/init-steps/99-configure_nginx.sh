@@ -1,4 +1,4 @@
-# Creates individual site config files for each service
+# Installs the generated site config (an upstream pool and server block per service)
 
 # Check if nginx is installed
 if ! command -v nginx &> /dev/null; then
@@ -28,82 +28,125 @@ if [[ -f "$NGINX_SITES_ENABLED/default" ]]; then
 	sudo rm -f "$NGINX_SITES_ENABLED/default"
 fi
 
-# Set up resolver and http-level directives at /etc/nginx/conf.d/
-# This avoids duplicate resolver errors across multiple server blocks
-# and keeps ingress-specific settings separate and idempotent
-if [[ ! -f "$NGINX_CONF" ]] || env_bool MHS_INGRESS_NUKE_NGINX_CONF; then
-	print_status "Creating nginx ingress global configuration..."
-	sudo tee "$NGINX_CONF" >/dev/null << 'EOF'
-# Ingress DNS resolver for static hostnames
-resolver 192.168.1.1 valid=10s;
-resolver_timeout 5s;
+# Set up http-level directives at /etc/nginx/conf.d/
+# Keeps ingress-specific settings separate and idempotent; the proxy cache zone defined here
+# is what the cache_paths locations in the generated site config store responses in. Rendered
+# on every run, so changes to the MHS_INGRESS_CACHE_* settings take effect.
+INGRESS_CACHE_DIR="${MHS_INGRESS_CACHE_DIR:-/var/cache/nginx/mhs-ingress}"
+RENDERED_NGINX_CONF=$(mktemp)
+cat > "$RENDERED_NGINX_CONF" << EOF
+# Cache for static/immutable upstream responses (see cache_paths in fleet.json)
+proxy_cache_path $INGRESS_CACHE_DIR levels=1:2 keys_zone=mhs_ingress:10m max_size=${MHS_INGRESS_CACHE_SIZE:-1g} inactive=${MHS_INGRESS_CACHE_INACTIVE:-30d} use_temp_path=off;
 
 # Allow long domain names
 server_names_hash_bucket_size 64;
 EOF
-	cat $NGINX_CONF
+PREVIOUS_NGINX_CONF=""  # set if this run changed $NGINX_CONF: its old copy, or "none"
+if ! sudo cmp -s "$RENDERED_NGINX_CONF" "$NGINX_CONF"; then
+	print_status "Writing nginx ingress global configuration: $NGINX_CONF"
+	PREVIOUS_NGINX_CONF=none
+	if sudo test -f "$NGINX_CONF"; then
+		PREVIOUS_NGINX_CONF=$(mktemp)
+		sudo cp "$NGINX_CONF" "$PREVIOUS_NGINX_CONF"
+	fi
+	sudo cp "$RENDERED_NGINX_CONF" "$NGINX_CONF"
+	cat "$RENDERED_NGINX_CONF"
 fi
+rm -f "$RENDERED_NGINX_CONF"
+sudo mkdir -p "$INGRESS_CACHE_DIR"
 
 if [[ ${#SERVICES[@]} -eq 0 ]]; then
 	print_warning "No services to configure in nginx"
 	return 0
 fi
 
-# Process each service
-config_count=${config_count:-0}
+# An upstream pool and server block per route, rendered by mhs (RenderNginxConfig) from
+# fleet.json and synced along with this script. nginx resolves upstream hostnames once, when it
+# loads the config: a name that doesn't resolve fails `nginx -t` for every site, and a device's
+# new address is only picked up on reload (see the DNS watch installed below).
+GENERATED_CONFIG="${MHS_NGINX_CONFIG_FILEPATH:-$ROOT_DIR/.temp/ingress-nginx.conf}"
+if [[ ! -f "$GENERATED_CONFIG" ]]; then
+	print_error "Generated nginx config not found: $GENERATED_CONFIG"
+	return 1
+fi
+
+unresolved=()
 for service in "${SERVICES[@]}"; do
-	print_status "Processing service: $service"
 	IFS='|' read -r DOMAIN HOSTNAME PORT <<< "$service"
-	
-	# Sanitize domain for filename
-	CONFIG_NAME="${DOMAIN//./}"
-	CONFIG_FILE="$NGINX_SITES_AVAILABLE/ingress-$CONFIG_NAME"
-	ENABLED_LINK="$NGINX_SITES_ENABLED/ingress-$CONFIG_NAME"
-
-	print_status "Creating nginx config: $DOMAIN -> $HOSTNAME:$PORT"
-	
-	# Create individual service config (resolver at http level, not here)
-	sudo tee "$CONFIG_FILE" >/dev/null << EOF
-# Generated by ingress/init for $DOMAIN
-server {
-	listen 80;
-	server_name $DOMAIN;
-	client_max_body_size 4G;
-
-	location / {
-		set \$backend "http://$HOSTNAME:$PORT";
-		proxy_pass \$backend;
-		proxy_http_version 1.1;
-		proxy_set_header Host \$host;
-		proxy_set_header X-Real-IP \$remote_addr;
-		proxy_set_header X-Forwarded-For \$proxy_add_x_forwarded_for;
-		proxy_set_header X-Forwarded-Proto \$scheme;
-		proxy_set_header Upgrade \$http_upgrade;
-		proxy_set_header Connection "upgrade";
-		proxy_read_timeout 86400;
-	}
-}
-EOF
-	
-	# Create symlink if it doesn't exist
-	if [[ ! -L "$ENABLED_LINK" ]]; then
-		sudo ln -sf "$CONFIG_FILE" "$ENABLED_LINK"
+	if ! getent hosts "$HOSTNAME" >/dev/null; then
+		unresolved+=("$HOSTNAME")
+	fi
+done
+if [[ ${#unresolved[@]} -gt 0 ]]; then
+	print_error "Upstream hosts do not resolve, leaving nginx as is: ${unresolved[*]}"
+	print_error "Run ./discover, or check the devices are online, then re-run init"
+	return 1
+fi
+
+CONFIG_FILE="$NGINX_SITES_AVAILABLE/my-home-server-ingress"
+ENABLED_LINK="$NGINX_SITES_ENABLED/my-home-server-ingress"
+
+# Set aside the current site and the per-service site files written by earlier versions of
+# this step, so they can be put back if the new config fails `nginx -t`
+PREVIOUS_SITES=$(mktemp -d)
+MOVED_SITES=()
+for site in "$CONFIG_FILE" "$NGINX_SITES_AVAILABLE"/ingress-* "$NGINX_SITES_ENABLED"/ingress-*; do
+	if [[ -e "$site" || -L "$site" ]]; then
+		sudo mv "$site" "$PREVIOUS_SITES/${#MOVED_SITES[@]}"
+		MOVED_SITES+=("$site")
 	fi
-	
-	print_success "nginx config created: $DOMAIN"
-	((config_count += 1))
 done
 
+sudo cp "$GENERATED_CONFIG" "$CONFIG_FILE"
+if [[ ! -L "$ENABLED_LINK" ]]; then
+	sudo ln -sf "$CONFIG_FILE" "$ENABLED_LINK"
+fi
+
 print_status "Testing nginx configuration..."
 if ! sudo nginx -t 2>&1 | grep -q "successful"; then
 	print_error "nginx configuration test failed"
-	sudo nginx -t
+	sudo nginx -t || true
+	print_status "Restoring the previous site configuration..."
+	sudo rm -f "$CONFIG_FILE" "$ENABLED_LINK"
+	for i in "${!MOVED_SITES[@]}"; do
+		sudo mv "$PREVIOUS_SITES/$i" "${MOVED_SITES[i]}"
+	done
+	if [[ -e "$CONFIG_FILE" ]]; then
+		sudo ln -sf "$CONFIG_FILE" "$ENABLED_LINK"
+	fi
+	sudo rm -rf "$PREVIOUS_SITES"
+	if [[ "$PREVIOUS_NGINX_CONF" == none ]]; then
+		sudo rm -f "$NGINX_CONF"
+	elif [[ -n "$PREVIOUS_NGINX_CONF" ]]; then
+		sudo cp "$PREVIOUS_NGINX_CONF" "$NGINX_CONF"
+	fi
 	return 1
 fi
 print_success "nginx configuration is valid"
 
+for site in "${MOVED_SITES[@]}"; do
+	[[ "$site" != "$CONFIG_FILE" ]] && print_status "Removed legacy site config: $site"
+done
+sudo rm -rf "$PREVIOUS_SITES"
+[[ "$PREVIOUS_NGINX_CONF" == /* ]] && rm -f "$PREVIOUS_NGINX_CONF"
+
+config_count=0
+for service in "${SERVICES[@]}"; do
+	IFS='|' read -r DOMAIN HOSTNAME PORT <<< "$service"
+	print_success "nginx config created: $DOMAIN -> $HOSTNAME:$PORT"
+	((config_count += 1))
+done
+
 print_status "Reloading nginx..."
 sudo systemctl reload nginx
 print_success "nginx reloaded"
 
+# Reload nginx whenever an upstream hostname resolves to a new address (e.g. after discovery
+# moves a device's DNS record), so proxying doesn't stay pinned to the old IP
+sudo install -m 755 "$SERVICE_DIR/bin/reload-on-dns-change" /usr/local/sbin/mhs-ingress-reload-on-dns-change
+echo "* * * * * root /usr/local/sbin/mhs-ingress-reload-on-dns-change >/dev/null" \
+	| sudo tee /etc/cron.d/mhs-ingress-dns >/dev/null
+sudo /usr/local/sbin/mhs-ingress-reload-on-dns-change >/dev/null || true
+print_success "Installed upstream DNS watch (/etc/cron.d/mhs-ingress-dns)"
+
 print_success "Configured $config_count nginx sites"
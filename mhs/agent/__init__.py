@@ -0,0 +1 @@
+"""Optional resident process that runs commands and queries for thin clients over a Unix socket."""
@@ -0,0 +1,52 @@
+"""Usage:
+python -m mhs.agent serve [--jobs N] [--warm]
+python -m mhs.agent call <action> [-- args...]
+python -m mhs.agent ping
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+
+def main(argv: list[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(prog="python -m mhs.agent", description=__doc__.split("\n")[0])
+  parser.add_argument("--socket", type=Path, help="defaults to MHS_AGENT_SOCKET")
+  subparsers = parser.add_subparsers(dest="mode", required=True)
+  serve = subparsers.add_parser("serve", help="run the agent in the foreground")
+  serve.add_argument("--jobs", type=int, help="jobs to run at once; defaults to MHS_AGENT_JOBS")
+  serve.add_argument("--warm", action="store_true", help="load the fleet and connect up front")
+  call = subparsers.add_parser("call", help="run an action on the agent")
+  call.add_argument("action", help="e.g. mhs/control/check_health")
+  call.add_argument("argv", nargs=argparse.REMAINDER, help="arguments for the action")
+  subparsers.add_parser("ping", help="exit 0 if an agent accepts connections, 1 otherwise")
+  args = parser.parse_args(argv)
+
+  if args.mode == "serve":
+    # masters must outlive idle gaps between jobs; they are closed when the agent exits
+    os.environ.setdefault("MHS_SSH_CONTROL_PERSIST", "yes")
+
+  from mhs import config
+  from mhs.output import print_error
+
+  socket_path = args.socket or config.AGENT_SOCKET
+  try:
+    if args.mode == "serve":
+      from mhs.agent.server import serve
+
+      serve(socket_path, args.jobs or config.AGENT_JOBS, warm=args.warm)
+      return 0
+
+    from mhs.agent.client import call, is_running
+
+    if args.mode == "ping":
+      return 0 if is_running(socket_path) else 1
+    return call(args.action, args.argv[1:] if args.argv[:1] == ["--"] else args.argv, socket_path)
+  except (OSError, RuntimeError) as e:
+    print_error(str(e))
+    return 1
+
+
+if __name__ == "__main__":
+  sys.exit(main())
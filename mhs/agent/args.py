@@ -0,0 +1,50 @@
+import argparse
+import dataclasses
+import types
+import typing
+from pathlib import Path
+
+_CONVERTERS = {str: str, int: int, float: float, Path: Path}
+
+
+def _converter(hint) -> typing.Callable[[str], object]:
+  """the type to parse a value as; unknown types (e.g. refs) are passed on as strings"""
+  if typing.get_origin(hint) in (typing.Union, types.UnionType):
+    hint = next(arg for arg in typing.get_args(hint) if arg is not type(None))
+  return _CONVERTERS.get(hint, str)
+
+
+def build_parser(cls: type, prog: str) -> argparse.ArgumentParser:
+  """derives a parser from the dataclass fields.
+
+  List fields and fields without a default are positional; everything else is an option,
+  with --flag/--no-flag for booleans. Help text comes from each field's metadata.
+  """
+  parser = argparse.ArgumentParser(prog=prog, description=(cls.__doc__ or "").strip())
+  hints = typing.get_type_hints(cls)
+  for field in dataclasses.fields(cls):
+    if not field.init:
+      continue
+    hint = hints[field.name]
+    required = (
+      field.default is dataclasses.MISSING and field.default_factory is dataclasses.MISSING
+    )
+    kwargs: dict = {"help": field.metadata.get("help")}
+    if not required:
+      default = field.default
+      if default is dataclasses.MISSING:
+        default = field.default_factory()
+      kwargs["default"] = default
+
+    flag = f"--{field.name.replace('_', '-')}"
+    if typing.get_origin(hint) is list:
+      item_type = (typing.get_args(hint) or (str,))[0]
+      kwargs |= {"nargs": "+" if required else "*", "type": _converter(item_type)}
+      parser.add_argument(field.name, **kwargs)
+    elif hint is bool:
+      parser.add_argument(flag, dest=field.name, action=argparse.BooleanOptionalAction, **kwargs)
+    elif required:
+      parser.add_argument(field.name, type=_converter(hint), **kwargs)
+    else:
+      parser.add_argument(flag, dest=field.name, type=_converter(hint), **kwargs)
+  return parser
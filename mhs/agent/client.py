@@ -0,0 +1,32 @@
+import json
+import socket
+import sys
+from pathlib import Path
+
+from mhs.config import AGENT_SOCKET
+
+
+def is_running(socket_path: Path = AGENT_SOCKET) -> bool:
+  """whether an agent accepts connections on the socket (a crashed one leaves the file behind)"""
+  with socket.socket(socket.AF_UNIX) as sock:
+    try:
+      sock.connect(str(socket_path))
+    except OSError:
+      return False
+  return True
+
+
+def call(action: str, argv: list[str], socket_path: Path = AGENT_SOCKET) -> int:
+  """runs the action on the agent, relaying its output; returns the exit code"""
+  with socket.socket(socket.AF_UNIX) as sock:
+    sock.connect(str(socket_path))
+    sock.sendall(json.dumps({"action": action, "argv": argv}).encode() + b"\n")
+    with sock.makefile("r", encoding="utf-8") as events:
+      for line in events:
+        event = json.loads(line)
+        if "exit_code" in event:
+          return event["exit_code"]
+        stream = sys.stderr if event.get("stream") == "stderr" else sys.stdout
+        stream.write(event.get("data", ""))
+        stream.flush()
+  raise RuntimeError("The agent closed the connection before the job finished")
@@ -0,0 +1,213 @@
+"""Runs commands and queries for clients, in one process that keeps its caches warm.
+
+The fleet model (re-parsed only when fleet.json changes), .env settings and SSH master
+connections all live as long as the agent, so every job after the first skips that setup and
+concurrent jobs share connections. Jobs queue for a fixed number of workers.
+
+Protocol: the client sends one JSON line, {"action": "mhs/control/...", "argv": [...]}, and
+receives JSON lines {"stream": "stdout" | "stderr", "data": ...} followed by {"exit_code": N}.
+"""
+
+import contextvars
+import dataclasses
+import importlib
+import json
+import queue
+import signal
+import socketserver
+import subprocess
+import sys
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TextIO
+
+from mhs.agent.args import build_parser
+from mhs.agent.client import is_running
+from mhs.config import AGENT_JOBS, AGENT_SOCKET, get_env
+from mhs.data.fleet.load.query import LoadFleet
+from mhs.output import print_error, print_info, print_warning
+from mhs.ssh.pool import ssh_options
+
+
+@dataclass(eq=False)
+class Job:
+  action: str
+  argv: list[str] = field(default_factory=list)
+  events: queue.Queue = field(default_factory=queue.Queue)
+
+  def send(self, **event):
+    self.events.put(event)
+
+
+_job: contextvars.ContextVar[Job | None] = contextvars.ContextVar("mhs_agent_job", default=None)
+"""the job being run; asyncio tasks and aio.to_thread calls inherit it, so a handler's helpers
+print to the right client (raw threads must be started with contextvars.copy_context().run)"""
+
+
+class OutputRouter:
+  """stands in for sys.stdout/stderr, sending what a job prints to that job's client"""
+
+  def __init__(self, stream: TextIO, name: str):
+    self.stream = stream
+    self.name = name
+
+  def write(self, text: str) -> int:
+    if job := _job.get():
+      job.send(stream=self.name, data=text)
+    else:
+      self.stream.write(text)
+    return len(text)
+
+  def flush(self):
+    self.stream.flush()
+
+  def isatty(self) -> bool:
+    return False
+
+  def __getattr__(self, name: str):
+    return getattr(self.stream, name)
+
+
+def _is_missing(error: ModuleNotFoundError, module_name: str) -> bool:
+  """whether the module (or its package) is missing, rather than something it imports"""
+  return bool(error.name) and (module_name + ".").startswith(error.name + ".")
+
+
+def resolve(action: str) -> Callable[[list[str]], object]:
+  """returns a function running the action (a command/query package, or one with a cli.py)"""
+  package = action.strip("/").replace("/", ".")
+  for module_name in ["command", "query"]:
+    try:
+      module = importlib.import_module(f"{package}.{module_name}")
+    except ModuleNotFoundError as e:
+      if _is_missing(e, f"{package}.{module_name}"):
+        continue
+      raise
+    for obj in vars(module).values():
+      if (
+        dataclasses.is_dataclass(obj)
+        and isinstance(obj, type)
+        and obj.__module__ == module.__name__
+        and hasattr(obj, "execute")
+      ):
+        parser = build_parser(obj, prog=action)
+        return lambda argv, cls=obj, parser=parser: cls(**vars(parser.parse_args(argv))).execute()
+
+  try:
+    cli = importlib.import_module(f"{package}.cli")
+  except ModuleNotFoundError as e:
+    if _is_missing(e, f"{package}.cli"):
+      raise ValueError(f"Unknown action: {action}")
+    raise
+  return lambda argv: cli.main()
+
+
+JOB_ERRORS = (RuntimeError, ValueError, LookupError, OSError, subprocess.SubprocessError)
+"""what commands raise when they fail; reported to the client as a plain error"""
+
+
+def run_job(job: Job):
+  token = _job.set(job)
+  exit_code = 1
+  try:
+    resolve(job.action)(job.argv)
+    exit_code = 0
+  except SystemExit as e:  # argparse usage errors and --help
+    exit_code = e.code if isinstance(e.code, int) else int(e.code is not None)
+  except JOB_ERRORS as e:
+    print_error(str(e) or type(e).__name__)
+  except Exception as e:
+    print_error(f"Unexpected {type(e).__name__}: {e} (traceback in the agent's output)")
+    raise
+  finally:
+    _job.reset(token)
+    job.send(exit_code=exit_code)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+  def handle(self):
+    try:
+      request = json.loads(self.rfile.readline())
+      job = Job(request["action"], list(request.get("argv", [])))
+    except (ValueError, KeyError, TypeError) as e:
+      self._write({"stream": "stderr", "data": f"Bad request: {e}\n"})
+      self._write({"exit_code": 2})
+      return
+
+    self.server.jobs.put(job)
+    while True:
+      event = job.events.get()
+      try:
+        self._write(event)
+      except OSError:
+        return  # client went away; the job still finishes
+      if "exit_code" in event:
+        return
+
+  def _write(self, event: dict):
+    self.wfile.write(json.dumps(event).encode() + b"\n")
+    self.wfile.flush()
+
+
+class AgentServer(socketserver.ThreadingUnixStreamServer):
+  daemon_threads = True
+
+  def __init__(self, socket_path: Path, workers: int):
+    self.jobs: queue.Queue[Job] = queue.Queue()
+    for _ in range(workers):
+      self._start_worker()
+    super().__init__(str(socket_path), _Handler)
+
+  def _start_worker(self):
+    threading.Thread(target=self._work, daemon=True).start()
+
+  def _work(self):
+    try:
+      while True:
+        run_job(self.jobs.get())
+    finally:
+      # an unexpected error ends the worker (threading prints its traceback); replace it
+      self._start_worker()
+
+
+def warm_up():
+  """loads the fleet and settings, and opens SSH masters to hosts that run services or mounts"""
+  try:
+    get_env()
+    fleet = LoadFleet().execute()
+  except (OSError, RuntimeError, ValueError) as e:
+    print_warning(f"Skipping warm-up: {e}")
+    return
+  hosts = [server.ssh_host for server in fleet.servers if server.services._index or server.mounts]
+  with ThreadPoolExecutor(max_workers=max(len(hosts), 1)) as executor:
+    list(executor.map(ssh_options, hosts))
+  print_info(f"Warmed up {fleet} and {len(hosts)} SSH host(s)")
+
+
+def serve(socket_path: Path = AGENT_SOCKET, workers: int = AGENT_JOBS, warm: bool = False):
+  socket_path.parent.mkdir(parents=True, exist_ok=True)
+  if socket_path.exists():
+    if is_running(socket_path):
+      raise RuntimeError(f"An agent is already listening on {socket_path}")
+    socket_path.unlink()  # left behind by an agent that didn't shut down cleanly
+
+  # SIGHUP re-reads .env on the next job; SIGTERM shuts down like Ctrl+C
+  signal.signal(signal.SIGHUP, lambda *_: get_env.cache_clear())
+  signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+  if warm:
+    warm_up()
+  sys.stdout = OutputRouter(sys.stdout, "stdout")
+  sys.stderr = OutputRouter(sys.stderr, "stderr")
+  try:
+    with AgentServer(socket_path, workers) as server:
+      print_info(f"Listening on {socket_path} with {workers} worker(s)")
+      server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    socket_path.unlink(missing_ok=True)
+    sys.stdout, sys.stderr = sys.stdout.stream, sys.stderr.stream
@@ -0,0 +1,101 @@
+"""Shared asyncio runtime for fanning out I/O-bound commands.
+
+Commands expose `aexecute()` alongside `execute()`. Drive them from synchronous code with
+`run()`, which reuses one event loop per thread, so concurrent callers (e.g. the agent's
+workers) each get their own. Per-host SSH session limits are process-wide, like the SSH
+masters they protect, and apply to blocking and async callers alike.
+"""
+
+import asyncio
+import threading
+import weakref
+from collections.abc import AsyncIterator, Awaitable, Callable, Coroutine, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, TypeVar
+
+from mhs.config import SSH_MAX_SESSIONS
+
+T = TypeVar("T")
+
+# asyncio's default executor has min(32, cpus + 4) threads, which would quietly cap `--jobs` for
+# to_thread work on a small host; gather's limit is what bounds concurrency
+MAX_THREADS = 64
+
+_local = threading.local()
+_host_limits: dict[str, threading.BoundedSemaphore] = {}
+"""ssh host -> semaphore capping concurrent sessions on its master"""
+_host_limits_lock = threading.Lock()
+
+
+class _LoopOwner:
+  """kept in the thread's locals, so the thread's loop is closed when the thread finishes"""
+
+  def __init__(self, loop: asyncio.AbstractEventLoop):
+    self.loop = loop
+    weakref.finalize(self, loop.close)
+
+
+def run(coro: Coroutine[Any, Any, T]) -> T:
+  """runs a coroutine to completion on the calling thread's event loop"""
+  owner = getattr(_local, "owner", None)
+  if owner is None:
+    loop = asyncio.new_event_loop()
+    loop.set_default_executor(ThreadPoolExecutor(MAX_THREADS, thread_name_prefix="mhs-aio"))
+    owner = _local.owner = _LoopOwner(loop)
+  return owner.loop.run_until_complete(coro)
+
+
+def _host_semaphore(ssh_host: str) -> threading.BoundedSemaphore:
+  with _host_limits_lock:
+    if ssh_host not in _host_limits:
+      _host_limits[ssh_host] = threading.BoundedSemaphore(SSH_MAX_SESSIONS)
+    return _host_limits[ssh_host]
+
+
+@contextmanager
+def host_session(ssh_host: str) -> Iterator[None]:
+  """holds one of the host's SSH sessions for a blocking call"""
+  with _host_semaphore(ssh_host):
+    yield
+
+
+@asynccontextmanager
+async def host_limit(ssh_host: str) -> AsyncIterator[None]:
+  """holds one of the host's SSH sessions without blocking the event loop"""
+  semaphore = _host_semaphore(ssh_host)
+  if not semaphore.acquire(blocking=False):
+    acquired = asyncio.get_running_loop().run_in_executor(None, semaphore.acquire)
+    try:
+      await asyncio.shield(acquired)
+    except asyncio.CancelledError:
+      # the waiting thread still gets the session; hand it straight back
+      acquired.add_done_callback(lambda _: semaphore.release())
+      raise
+  try:
+    yield
+  finally:
+    semaphore.release()
+
+
+async def to_thread(func: Callable[[], T]) -> T:
+  """runs a blocking call (e.g. a command's execute) without blocking the event loop"""
+  return await asyncio.to_thread(func)
+
+
+async def gather(
+  aws: Iterable[Awaitable[T]],
+  limit: int = 0,
+  return_exceptions: bool = False,
+) -> list[T | BaseException]:
+  """awaits everything, running at most `limit` at a time (0 means no limit)"""
+  if limit < 1:
+    return await asyncio.gather(*aws, return_exceptions=return_exceptions)
+
+  semaphore = asyncio.Semaphore(limit)
+
+  async def limited(aw: Awaitable[T]) -> T:
+    async with semaphore:
+      return await aw
+
+  return await asyncio.gather(*(limited(aw) for aw in aws), return_exceptions=return_exceptions)
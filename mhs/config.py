@@ -1,6 +1,61 @@
+import functools
+import os
+from pathlib import Path
+
 from mhs import LOCAL_ROOT
 
 FLEET_FILE = LOCAL_ROOT / "fleet.json"
 EXAMPLE_ENV_FILE = LOCAL_ROOT / "example.env"
 ENV_FILE = LOCAL_ROOT / ".env"
 DOMAIN_SUFFIX = "lan"
+
+# ControlMaster sockets are not supported by the Windows OpenSSH client
+SSH_MULTIPLEX = os.name != "nt" and os.getenv("MHS_SSH_MULTIPLEX", "1") == "1"
+SSH_CONTROL_PERSIST = os.getenv("MHS_SSH_CONTROL_PERSIST", "60")
+# sshd's MaxSessions (default 10) caps the sessions a multiplexed master can carry
+SSH_MAX_SESSIONS = int(os.getenv("MHS_SSH_MAX_SESSIONS", "8"))
+# "1" prints a timing tree on exit; a file path writes it there (.json: Chrome trace format)
+TRACE = os.getenv("MHS_TRACE", "")
+# the optional resident agent (python -m mhs.agent serve)
+AGENT_SOCKET = Path(os.getenv("MHS_AGENT_SOCKET", LOCAL_ROOT / ".temp" / "mhs-agent.sock"))
+AGENT_JOBS = int(os.getenv("MHS_AGENT_JOBS", "4"))
+
+
+def load_env_file(filepath: Path) -> dict[str, str]:
+  env_vars = {}
+  if not filepath.exists():
+    return env_vars
+
+  for line in filepath.read_text().splitlines():
+    line = line.strip()
+    # Skip empty lines and comments
+    if not line or line.startswith("#"):
+      continue
+    # Parse KEY=VALUE
+    if "=" in line:
+      key, value = line.split("=", 1)
+      env_vars[key.strip()] = value.strip()
+
+  return env_vars
+
+
+@functools.cache
+def get_env() -> dict[str, str]:
+  """settings from ENV_FILE, with environment variable overrides; read once per process"""
+  if not ENV_FILE.exists():
+    ENV_FILE.write_text(EXAMPLE_ENV_FILE.read_text())
+    raise RuntimeError(
+      f"Created default .env file at {ENV_FILE}. Customize it as necessary, then rerun."
+    )
+
+  env = load_env_file(ENV_FILE)
+  for key in env:
+    if key in os.environ:
+      env[key] = os.environ[key]
+  return env
+
+
+def get_setting(key: str) -> str:
+  if (value := get_env().get(key)) is None:
+    raise RuntimeError(f"{key} is not set in {ENV_FILE}")
+  return value
@@ -0,0 +1 @@
+"""Probes every service in the fleet over HTTP, on the LAN and through ingress."""
@@ -0,0 +1,32 @@
+from dataclasses import dataclass, field
+
+from mhs.trace import traced
+
+
+@dataclass
+class CheckHealth:
+  """checks that every service in the fleet answers HTTP, concurrently."""
+
+  timeout: float = field(
+    default=5.0,
+    metadata={"help": "Seconds to wait for each endpoint before marking it down"},
+  )
+  jobs: int = field(
+    default=16,
+    metadata={"help": "Maximum number of endpoints to probe concurrently"},
+  )
+  lan: bool = field(default=True, metadata={"help": "Probe services at hostname:port"})
+  public: bool = field(default=True, metadata={"help": "Probe services at subdomain.domain"})
+  json: bool = field(default=False, metadata={"help": "Print the report as JSON"})
+
+  def __post_init__(self):
+    if self.jobs < 1:
+      raise ValueError("jobs must be at least 1")
+    if self.timeout <= 0:
+      raise ValueError("timeout must be positive")
+
+  @traced
+  def execute(self):
+    from mhs.control.check_health.handler import handle
+
+    return handle(self)
@@ -0,0 +1,46 @@
+from dataclasses import asdict, dataclass
+
+LAN = "lan"
+PUBLIC = "public"
+
+
+@dataclass(frozen=True)
+class Endpoint:
+  """one address a service should answer HTTP requests on"""
+
+  service_key: str
+  kind: str
+  """LAN (host:port) or PUBLIC (subdomain.domain, through ingress)"""
+  host: str
+  port: int = 80
+
+  def __str__(self) -> str:
+    return self.url
+
+  @property
+  def url(self) -> str:
+    return f"http://{self.host}/" if self.port == 80 else f"http://{self.host}:{self.port}/"
+
+
+@dataclass
+class CheckResult:
+  endpoint: Endpoint
+  status: int = 0
+  """HTTP status, or 0 if no response arrived"""
+  latency_ms: float = 0.0
+  error: str = ""
+
+  @property
+  def ok(self) -> bool:
+    # auth walls and redirects still prove the service is up
+    return not self.error and 0 < self.status < 500
+
+  def to_dict(self) -> dict:
+    return {
+      **asdict(self.endpoint),
+      "url": self.endpoint.url,
+      "ok": self.ok,
+      "status": self.status,
+      "latency_ms": round(self.latency_ms, 1),
+      "error": self.error,
+    }
@@ -0,0 +1,84 @@
+import functools
+import http.client
+import json
+import time
+from datetime import UTC, datetime
+
+from mhs import aio
+from mhs.control.check_health.command import CheckHealth
+from mhs.control.check_health.entity import LAN, PUBLIC, CheckResult, Endpoint
+from mhs.data.fleet.entity import Fleet
+from mhs.data.fleet.load.query import LoadFleet
+from mhs.output import print_error, print_info, print_success
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+def get_endpoints(fleet: Fleet, lan=True, public=True) -> list[Endpoint]:
+  """every address the fleet's services should answer on"""
+  endpoints: list[Endpoint] = []
+  for service in fleet.services._index.values():
+    if lan and (host := fleet.servers.get_host(service)):
+      endpoints.append(Endpoint(service.key, LAN, host.hostname, service.port))
+    if public and (domain := fleet.domains.get(service.domain_key)) and service.subdomain:
+      endpoints.append(Endpoint(service.key, PUBLIC, f"{service.subdomain}.{domain}"))
+  return endpoints
+
+
+def probe(endpoint: Endpoint, timeout: float) -> CheckResult:
+  result = CheckResult(endpoint)
+  connection = http.client.HTTPConnection(endpoint.host, endpoint.port, timeout=timeout)
+  started = time.monotonic()
+  try:
+    connection.request("GET", "/", headers={"User-Agent": "mhs-health"})
+    response = connection.getresponse()
+    response.read(MAX_BODY_BYTES)
+    result.status = response.status
+  except (OSError, http.client.HTTPException) as e:
+    result.error = str(e) or type(e).__name__
+  finally:
+    connection.close()
+  result.latency_ms = (time.monotonic() - started) * 1000
+  return result
+
+
+async def check_all(endpoints: list[Endpoint], timeout: float, jobs: int) -> list[CheckResult]:
+  """probes every endpoint concurrently; each takes at most about `timeout` seconds"""
+  return await aio.gather(
+    [aio.to_thread(functools.partial(probe, endpoint, timeout)) for endpoint in endpoints],
+    limit=jobs,
+  )
+
+
+def build_report(results: list[CheckResult], started: datetime, duration_ms: float) -> dict:
+  return {
+    "ok": all(result.ok for result in results),
+    "checked_at": started.isoformat(timespec="seconds"),
+    "duration_ms": round(duration_ms, 1),
+    "checks": [result.to_dict() for result in results],
+  }
+
+
+def handle(command: CheckHealth) -> dict:
+  fleet = LoadFleet().execute()
+  endpoints = get_endpoints(fleet, lan=command.lan, public=command.public)
+
+  started = datetime.now(UTC)
+  clock = time.monotonic()
+  results = aio.run(check_all(endpoints, command.timeout, command.jobs))
+  report = build_report(results, started, (time.monotonic() - clock) * 1000)
+
+  if command.json:
+    print(json.dumps(report, indent=2))
+  else:
+    for result in results:
+      summary = f"{result.endpoint.service_key} ({result.endpoint.kind}) {result.endpoint}"
+      if result.ok:
+        print_success(f"{summary}: {result.status} in {result.latency_ms:.0f}ms")
+      else:
+        print_error(f"{summary}: {result.error or result.status} in {result.latency_ms:.0f}ms")
+    print_info(f"Checked {len(results)} endpoint(s) in {report['duration_ms']:.0f}ms")
+
+  if failed := [result for result in results if not result.ok]:
+    raise RuntimeError(f"{len(failed)}/{len(results)} health check(s) failed")
+  return report
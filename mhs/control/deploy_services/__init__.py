@@ -0,0 +1 @@
+"""Deploys several services across the fleet concurrently, in dependency order."""
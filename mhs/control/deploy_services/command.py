@@ -0,0 +1,29 @@
+from dataclasses import dataclass, field
+
+from mhs.trace import traced
+
+
+@dataclass
+class DeployServices:
+  """deploys the given services (or every service in the fleet) that have a compose project."""
+
+  services: list[str] = field(
+    default_factory=list,
+    metadata={"help": "Service keys to deploy; defaults to every service with a compose project"},
+  )
+  jobs: int = field(
+    default=4,
+    metadata={"help": "Maximum number of hosts to deploy to concurrently"},
+  )
+  start_service: bool = True
+  force_recreate: bool = False
+
+  def __post_init__(self):
+    if self.jobs < 1:
+      raise ValueError("jobs must be at least 1")
+
+  @traced
+  def execute(self):
+    from mhs.control.deploy_services.handler import handle
+
+    return handle(self)
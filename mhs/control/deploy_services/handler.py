@@ -0,0 +1,104 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+from mhs import LOCAL_ROOT, aio
+from mhs.control.deploy_services.command import DeployServices
+from mhs.data.fleet.load.query import LoadFleet
+from mhs.device.server.entity import ServerRef
+from mhs.output import print_error, print_info, print_success, print_warning
+from mhs.service.deploy.command import DeployService
+from mhs.service.entity import Service
+
+
+def is_deployable(service: Service, etc_dir: Path = LOCAL_ROOT / "etc") -> bool:
+  """whether the service has a compose project in etc/<key> for DeployService to run"""
+  return (etc_dir / service.key / "docker-compose.yml").is_file()
+
+
+async def run_in_order(
+  services: list[Service],
+  hosts: dict[str, str],
+  deploy: Callable[[Service], Awaitable[None]],
+  jobs: int,
+) -> dict[str, str]:
+  """Deploys services concurrently; returns an error message per service that did not deploy.
+
+  A service starts once every selected service it depends on has deployed, and only
+  one service deploys to a given host at a time. Dependencies that aren't selected (e.g.
+  services with nothing to deploy) count as satisfied. Dependents of a failed service are
+  skipped.
+  """
+  selected = {service.key for service in services}
+  pending = {service.key: service for service in services}
+  done: set[str] = set()
+  failures: dict[str, str] = {}
+  running: dict[asyncio.Task, Service] = {}
+
+  while pending or running:
+    busy_hosts = {hosts[service.key] for service in running.values()}
+    for key, service in list(pending.items()):
+      deps = [dep for dep in service.depends_on if dep in selected]
+      if failed := [dep for dep in deps if dep in failures]:
+        failures[key] = f"skipped: {', '.join(failed)} failed"
+        del pending[key]
+      elif all(dep in done for dep in deps) and hosts[key] not in busy_hosts:
+        if len(running) < jobs:
+          busy_hosts.add(hosts[key])
+          running[asyncio.ensure_future(deploy(service))] = pending.pop(key)
+
+    if not running:
+      for key in pending:
+        failures[key] = "skipped: dependency cycle"
+      break
+
+    finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+    for task in finished:
+      service = running.pop(task)
+      if error := task.exception():
+        failures[service.key] = str(error)
+      else:
+        done.add(service.key)
+
+  return failures
+
+
+def handle(command: DeployServices):
+  fleet = LoadFleet().execute()
+
+  selected = []
+  for key in command.services:
+    try:
+      selected.append(fleet.services[key])
+    except KeyError:
+      raise RuntimeError(f"Unknown service {key}")
+
+  # services without a compose project (e.g. jellyfin, or ingress, which its init script sets
+  # up) have nothing to deploy, so their dependents don't wait for them
+  services = []
+  for service in selected or fleet.services._index.values():
+    if is_deployable(service):
+      services.append(service)
+    else:
+      print_warning(f"Skipping {service}: no etc/{service.key}/docker-compose.yml")
+
+  hosts = {service.key: fleet.get_service_host(service).key for service in services}
+
+  def deploy(service: Service) -> Awaitable[None]:
+    return DeployService(
+      service,
+      host=ServerRef(hosts[service.key]),
+      start_service=command.start_service,
+      force_recreate=command.force_recreate,
+    ).aexecute()
+
+  print_info(f"Deploying {len(services)} services to {len(set(hosts.values()))} hosts...")
+  failures = aio.run(run_in_order(services, hosts, deploy, command.jobs))
+
+  for service in services:
+    if service.key in failures:
+      print_error(f"{service} on {hosts[service.key]}: {failures[service.key]}")
+    else:
+      print_success(f"{service} on {hosts[service.key]}")
+  if failures:
+    raise RuntimeError(f"Failed to deploy {len(failures)} service(s)")
@@ -1,4 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+from mhs.trace import traced
 
 
 @dataclass
@@ -6,7 +8,32 @@ class DiscoverDevices:
   """attempts to discover all devices in the fleet on the network."""
 
   skip_dns_refresh: bool = False
+  jobs: int = field(
+    default=4,
+    metadata={"help": "Maximum number of devices to discover concurrently"},
+  )
+  batch: bool = field(
+    default=False,
+    metadata={"help": "Deploy all discovery scripts in one bundle imported on the router"},
+  )
+  consolidated: bool = field(
+    default=False,
+    metadata={"help": "Discover every device from one router script and scheduler"},
+  )
+  lease_events: bool = field(
+    default=False,
+    metadata={"help": "Consolidated, and also triggered by DHCP leases; polling is a fallback"},
+  )
+
+  def __post_init__(self):
+    if self.jobs < 1:
+      raise ValueError("jobs must be at least 1")
+    if self.lease_events:
+      self.consolidated = True
+    if self.batch and self.consolidated:
+      raise ValueError("batch and consolidated are mutually exclusive")
 
+  @traced
   def execute(self):
     from mhs.control.discover_devices.handler import handle
 
@@ -1,87 +1,57 @@
-import json
-import shlex
-from pathlib import Path
-
-from mhs.config import FLEET_FILE
+from mhs import aio
 from mhs.control.discover_devices.command import DiscoverDevices
+from mhs.control.sync_split_dns.command import SyncSplitDns
 from mhs.data.fleet.load.query import LoadFleet
-from mhs.device.discover.command import DiscoverDevice
+from mhs.device.discover.command import (
+  DiscoverDevice,
+  DiscoverDeviceBatch,
+  DiscoverFleet,
+  RemoveFleetDiscovery,
+)
 from mhs.device.server.entity import Server, ServerRef
-from mhs.output import print_error, print_success, print_warning
-from mhs.ssh.run_on.command import RunOn
-
-
-def load_domains(fleet_file: Path) -> dict[str, str]:
-  """loads domain configurations from the fleet file"""
-  domains: dict[str, str] = {}
-  fleet = json.loads(fleet_file.read_text())
-  for key, props in fleet.get("domains", {}).items():
-    if domain := props.get("domain"):
-      domains[key] = domain
-  return domains
-
-
-def get_public_hostnames(device: Server, domains: dict[str, str]) -> list[str]:
-  """returns the public hostname for the device if configured with a domain"""
-  hostnames: list[str] = []
-  for service in device.services._index.values():
-    if domain_key := service.domain_key:
-      if domain := domains.get(domain_key):
-        if subdomain := service.subdomain:
-          hostname = f"{subdomain}.{domain}"
-          hostnames.append(hostname)
-  return hostnames
-
-
-def clear_split_dns(hostname: str) -> None:
-  """removes existing split DNS entries for the given hostname"""
-  cmd = f'/ip dns static remove [find name~"{hostname}"]'
-  output, success = RunOn("router", cmd).execute()
-  if not success:
-    print_warning(f"Failed to clear split DNS for {hostname}: {output}")
+from mhs.output import print_error, print_info, print_warning
 
 
-def configure_split_dns(hostname: str, ingress_ip: str) -> None:
-  """avoids hairpinning by allowing LAN devices to resolve public hostnames via the router's DNS"""
-  cmd = f'/ip dns static add name="{hostname}" address="{ingress_ip}" ttl=30m comment="Split DNS for {hostname}"'
-  output, success = RunOn("router", cmd).execute()
-  if not success:
-    print_warning(f"Failed to configure split DNS for {hostname}: {output}")
-  print_success(f"Configured split DNS for {hostname} to {ingress_ip}")
-
-
-def get_ingress_ip(hostname="ingress.lan") -> str:
-  """returns the IP address of the device running the public ingress service"""
-  ip = ""
-  output, success = RunOn(
-    "router",
-    f":put [/ip dns static get [find name={shlex.quote(hostname)}] address]",
-  ).execute()
-  if success:
-    ip = output.strip()
-  else:
-    print_error("Failed to get ingress IP from router")
-  return ip
+async def discover_all(devices: list[Server], jobs: int) -> dict[str, str]:
+  """discovers devices concurrently; returns an error message per device that failed"""
+  results = await aio.gather(
+    [DiscoverDevice(ServerRef(device.key)).aexecute() for device in devices],
+    limit=jobs,
+    return_exceptions=True,
+  )
+  failures: dict[str, str] = {}
+  for device, result in zip(devices, results):
+    if isinstance(result, BaseException):
+      failures[device.key] = str(result)
+    elif not result:
+      failures[device.key] = "deployment failed"
+  return failures
 
 
 def handle(command: DiscoverDevices):
   fleet = LoadFleet().execute()
   print(f"Discovering all devices in {fleet}...")
 
-  public_hostnames: set[str] = set()
-  domains = load_domains(FLEET_FILE)
-
-  for device in fleet.servers._index.values():
-    public_hostnames.update(get_public_hostnames(device, domains))
-    DiscoverDevice(ServerRef(device.key)).execute()
+  devices = list(fleet.servers)
+  if command.consolidated:
+    failures = DiscoverFleet(lease_events=command.lease_events).execute()
+  else:
+    if command.batch:
+      failures = DiscoverDeviceBatch([device.key for device in devices]).execute()
+    else:
+      failures = aio.run(discover_all(devices, command.jobs))
+    # otherwise a previous consolidated setup would keep rediscovering alongside these scripts
+    if not RemoveFleetDiscovery().execute():
+      print_warning("The consolidated discovery script or its DHCP lease hook may remain")
 
   if not command.skip_dns_refresh:
-    if ingress_ip := get_ingress_ip():
-      for domain in domains.values():
-        clear_split_dns(domain)
-      for hostname in public_hostnames:
-        configure_split_dns(hostname, ingress_ip)
-    else:
-      print_warning(
-        "Could not configure split DNS: Ingress IP not found (you may have ingress issues on LAN)"
-      )
+    SyncSplitDns(
+      hostnames=sorted(set(fleet.get_public_hostnames())),
+      domains=list(fleet.domains.values()),
+    ).execute()
+
+  print_info(f"Discovered {len(devices) - len(failures)}/{len(devices)} devices")
+  for key, error in sorted(failures.items()):
+    print_error(f"{key}: {error}")
+  if failures:
+    raise RuntimeError(f"Failed to discover {len(failures)} device(s)")
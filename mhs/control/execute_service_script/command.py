@@ -1,5 +1,7 @@
 from dataclasses import dataclass, field
 
+from mhs.trace import traced
+
 
 @dataclass
 class ExecuteServiceScript:
@@ -8,7 +10,12 @@ class ExecuteServiceScript:
   executable: str = field(
     metadata={"help": "Relative path to executable script from root"},
   )
+  full_sync: bool = field(
+    default=False,
+    metadata={"help": "Push every file, even if unchanged since the last sync"},
+  )
 
+  @traced
   def execute(self, *args, **kwargs):
     from mhs.control.execute_service_script.handler import handle
 
@@ -1,30 +1,135 @@
+import hashlib
+import json
 import logging
 import os
 import subprocess
+import tarfile
 from pathlib import Path
 
+from mhs import trace
 from mhs.config import LOCAL_ROOT
 from mhs.control.execute_service_script.command import ExecuteServiceScript
 from mhs.data.fleet.load.query import LoadFleet
 from mhs.device.server.entity import Server
 from mhs.output import print_error, print_info, print_success, print_warning
 from mhs.service.entity import ServiceRef
-from mhs.ssh.run_on.command import RunOn
+from mhs.ssh.pool import rsync_shell, ssh_options
 
 logger = logging.getLogger(__name__)
 
+INGRESS_SERVICE_KEY = "ingress"
 
-def ensure_remote_dir(server: Server, remote_dir: str):
-  print_info(f"Ensuring {remote_dir} exists on {server.description}...")
-  if server.host_os == "windows":
-    mkdir_cmd = f'powershell -Command "New-Item -ItemType Directory -Path {remote_dir} -Force"'
-  else:
-    mkdir_cmd = f"mkdir -p {remote_dir}"
 
-  RunOn(
-    server.ssh_host,
-    mkdir_cmd,
-  ).execute()
+def push_archive(
+  ssh_host: str,
+  files: list[str],
+  root_dir: Path,
+  remote_root: str,
+  debug: bool = False,
+) -> bool:
+  """Streams files to the remote as one tar archive, unpacked under remote_root.
+
+  Paths in the archive carry the remote_root prefix so that tar creates any missing
+  directories itself, which avoids a separate mkdir per directory.
+  """
+  ssh_cmd = ["ssh", *ssh_options(ssh_host), ssh_host, "tar -xf -"]
+  if debug:
+    print_info(f"Streaming {len(files)} files: {' '.join(ssh_cmd)}")
+
+  with trace.process(ssh_cmd) as span:
+    process = subprocess.Popen(
+      ssh_cmd,
+      stdin=subprocess.PIPE,
+      stdout=subprocess.DEVNULL,
+      stderr=subprocess.PIPE,
+    )
+    try:
+      with tarfile.open(fileobj=process.stdin, mode="w|") as archive:
+        for file_rel in files:
+          archive.add(root_dir / file_rel, arcname=f"{remote_root}/{file_rel}", recursive=False)
+      process.stdin.close()
+    except (OSError, BrokenPipeError) as e:
+      process.kill()
+      print_error(f"Failed to stream files to {ssh_host}: {e}")
+      return False
+
+    stderr = process.stderr.read()
+    span.attrs.update(exit_code=process.wait(), bytes_out=archive.offset)
+  if process.returncode:
+    print_error(f"Error during push: {stderr.decode(errors='replace')}")
+    return False
+  return True
+
+
+def extract_newer(archive: tarfile.TarFile, root_dir: Path) -> list[str]:
+  """Extracts members unless the local file is at least as new (like rsync -u); returns those
+  extracted. Keeps a local edit (e.g. to a service .env) from being replaced by the remote copy.
+  """
+  extracted = []
+  for member in archive:
+    local_path = root_dir / member.name
+    if member.isfile() and local_path.is_file() and local_path.stat().st_mtime >= member.mtime:
+      continue
+    archive.extract(member, root_dir, filter="data")
+    extracted.append(member.name)
+  return extracted
+
+
+TAR_FAILURE_TRAILERS = (
+  "Exiting with failure status due to previous errors",  # GNU tar
+  "Error exit delayed from previous errors",  # bsdtar (tar.exe on Windows)
+)
+
+
+def only_missing_files(stderr: str) -> bool:
+  """whether tar's errors are all about files that don't exist on the remote (yet)"""
+  errors = [
+    line
+    for line in stderr.splitlines()
+    if line.strip() and not any(trailer in line for trailer in TAR_FAILURE_TRAILERS)
+  ]
+  return all("No such file" in line for line in errors)
+
+
+def pull_archive(
+  ssh_host: str,
+  files: list[str],
+  root_dir: Path,
+  remote_root: str,
+  debug: bool = False,
+) -> bool:
+  """Streams files from remote_root as one tar archive; files missing on the remote are skipped,
+  as are files that are newer locally."""
+  remote_cmd = f'tar -cf - -C "{remote_root}" ' + " ".join(f'"{file_rel}"' for file_rel in files)
+  ssh_cmd = ["ssh", *ssh_options(ssh_host), ssh_host, remote_cmd]
+  if debug:
+    print_info(f"Streaming {len(files)} files: {' '.join(ssh_cmd)}")
+
+  with trace.process(ssh_cmd) as span:
+    process = subprocess.Popen(ssh_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+      with tarfile.open(fileobj=process.stdout, mode="r|") as archive:
+        extracted = extract_newer(archive, root_dir)
+        span.attrs["bytes_in"] = archive.offset
+      if debug:
+        print_info(f"Pulled {len(extracted)} of {len(files)} files")
+    except tarfile.ReadError:
+      pass  # no archive at all: either none of the files exist yet, or ssh failed (see below)
+    except (OSError, tarfile.TarError) as e:
+      process.kill()
+      print_error(f"Failed to stream files from {ssh_host}: {e}")
+      return False
+
+    _, stderr = process.communicate()
+    span.attrs["exit_code"] = process.returncode
+  stderr = stderr.decode(errors="replace")
+  if process.returncode and not only_missing_files(stderr):
+    print_error(f"Error during pull from {ssh_host}: {stderr}")
+    return False
+  if process.returncode and debug:
+    # tar exits nonzero when some files are missing (this may be normal)
+    print_info(f"tar stderr: {stderr}")
+  return True
 
 
 def run_rsync(
@@ -50,7 +155,7 @@ def run_rsync(
   if debug:
     print_info(f"Running {operation} command: {' '.join(cmd)}")
 
-  result = subprocess.run(
+  result = trace.run(
     cmd,
     check=False,
     cwd=local_base,
@@ -75,6 +180,25 @@ def run_rsync(
     return False
 
 
+def hash_files(files: list[str], root_dir: Path) -> dict[str, str]:
+  """returns {file: sha256} of files under root_dir; missing files hash to an empty string"""
+  hashes = {}
+  for file_rel in files:
+    try:
+      hashes[file_rel] = hashlib.sha256((root_dir / file_rel).read_bytes()).hexdigest()
+    except OSError:
+      hashes[file_rel] = ""
+  return hashes
+
+
+def load_manifest(manifest_file: Path) -> dict[str, str]:
+  """returns {file: sha256} as of the last successful push, or nothing if unknown"""
+  try:
+    return json.loads(manifest_file.read_text())
+  except (OSError, json.JSONDecodeError):
+    return {}
+
+
 def bidirectional_sync(
   server: Server,
   from_remote_files: list[str],
@@ -84,7 +208,15 @@ def bidirectional_sync(
   temp_dir_name: str = ".temp",
   debug=False,
   scp_only=False,
+  manifest_file: Path | None = None,
+  full_sync=False,
 ):
+  """Pulls from_remote_files, then pushes to_remote_files.
+
+  If a manifest_file is given, only files whose content changed since the last successful
+  push (as recorded in the manifest) are pushed, and the manifest is updated afterwards.
+  A full_sync pushes every file but still records them in the manifest.
+  """
   success = True
   root_dir = Path(root_dir).resolve()
   remote_root = root_dir.name
@@ -101,12 +233,14 @@ def bidirectional_sync(
     down_includes.write_text("\n".join(from_remote_files))
 
     if scp_only:
-      pass  # not implemented yet
+      if not pull_archive(ssh_host, from_remote_files, root_dir, remote_root, debug):
+        success = False
     else:
       pullback_cmd = [
         "rsync",
         "-auz",
         "-vv" if debug else "-v",
+        *rsync_shell(ssh_host),
         "--relative",
         "--files-from",
         down_includes.relative_to(root_dir).as_posix(),
@@ -117,6 +251,14 @@ def bidirectional_sync(
       if not run_rsync(pullback_cmd, root_dir, "pull", debug, allow_missing=True):
         success = False
 
+  # Skip files that haven't changed since they were last pushed
+  manifest = load_manifest(manifest_file) if manifest_file else {}
+  hashes = hash_files(to_remote_files, root_dir)
+  if manifest_file and not full_sync:
+    to_remote_files = [f for f in to_remote_files if not hashes[f] or manifest.get(f) != hashes[f]]
+    if not to_remote_files:
+      print_info(f"No local changes to push to {ssh_host}")
+
   # Sync TO remote (push changes)
   if to_remote_files:
     if debug:
@@ -127,40 +269,15 @@ def bidirectional_sync(
     up_includes.write_text("\n".join(to_remote_files))
 
     if scp_only:
-      # create dir structure on remote
-      dir_set = set()
-      for file_rel in to_remote_files:
-        local_path = root_dir / file_rel
-        parent_dir = local_path.parent
-        if parent_dir != root_dir and parent_dir.as_posix() not in dir_set:
-          rel_dir = parent_dir.relative_to(root_dir)
-          ensure_remote_dir(server, f"{remote_root}/{rel_dir.as_posix()}")
-          dir_set.add(parent_dir.as_posix())
-      # use scp to copy files individually to the remote
-      for file_rel in to_remote_files:
-        local_path = root_dir / file_rel
-        remote_path = f"{ssh_host}:{remote_root}/{file_rel}"
-        scp_cmd = ["scp", local_path.as_posix(), remote_path]
-        try:
-          if debug:
-            print_info(f"Running SCP command: {' '.join(scp_cmd)}")
-          subprocess.run(
-            scp_cmd,
-            check=True,
-            capture_output=True,
-            text=True,
-          )
-          if debug:
-            print_success(f"Uploaded '{file_rel}' to {ssh_host}")
-        except Exception as e:
-          print_error(f"SCP failed for '{file_rel}': {e}")
-          success = False
+      if not push_archive(ssh_host, to_remote_files, root_dir, remote_root, debug):
+        success = False
     else:
       push_cmd = [
         "rsync",
         "-az",
         "-vv" if debug else "-v",
         "--delete",
+        *rsync_shell(ssh_host),
         "--relative",
         "--files-from",
         up_includes.relative_to(root_dir).as_posix(),
@@ -171,6 +288,10 @@ def bidirectional_sync(
       if not run_rsync(push_cmd, root_dir, "push", debug):
         success = False
 
+  if manifest_file and to_remote_files and success:
+    manifest.update({f: hashes[f] for f in to_remote_files})
+    manifest_file.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+
   return success
 
 
@@ -208,6 +329,19 @@ def gather_files_to_sync(src_dir: str, root_dir: Path):
   return filepaths
 
 
+def render_ingress_files(fleet_file: Path, root_dir: Path) -> list[str]:
+  """renders what the ingress init steps read instead of re-joining fleet.json: the routing
+  table and the nginx site config; returns their paths relative to root_dir"""
+  from mhs.control.service.ingress.render_nginx_config.command import RenderNginxConfig
+  from mhs.data.fleet.resolve_routes.query import ResolveRoutes
+
+  routes_file = root_dir / ".temp" / "routes.txt"
+  ResolveRoutes(fleet_file, output=routes_file).execute()
+  nginx_config_file = root_dir / ".temp" / "ingress-nginx.conf"
+  RenderNginxConfig(fleet_file, output=nginx_config_file).execute()
+  return [file.relative_to(root_dir).as_posix() for file in [routes_file, nginx_config_file]]
+
+
 def handle(command: ExecuteServiceScript, *args):
   root_dir = Path(LOCAL_ROOT).resolve()
   local_etc = root_dir / "etc"
@@ -231,6 +365,8 @@ def handle(command: ExecuteServiceScript, *args):
     ".env",
     fleet_file.relative_to(root_dir).as_posix(),
   ]
+  if service_key == INGRESS_SERVICE_KEY:
+    to_remote_files.extend(render_ingress_files(fleet_file, root_dir))
   to_remote_files.extend(gather_files_to_sync("lib", root_dir))
   to_remote_files.extend(gather_files_to_sync(f"etc/{service_key}", root_dir))
 
@@ -242,6 +378,8 @@ def handle(command: ExecuteServiceScript, *args):
     from_remote_files=from_remote_files,
     root_dir=root_dir,
     scp_only=server.host_os == "windows",
+    manifest_file=root_dir / ".temp" / f"sync-{ssh_host}.json",
+    full_sync=command.full_sync,
   ):
     raise RuntimeError("File synchronization failed")
 
@@ -250,10 +388,11 @@ def handle(command: ExecuteServiceScript, *args):
   remote_executable = remote_executable_path.as_posix()
   print_info(f"Executing {remote_executable} on {server.key}...")
   remote_cmd = f"cd {root_dir.name} && etc/{remote_executable} {' '.join(args)}"
-  ssh_exec_cmd = ["ssh", ssh_host, "-t", remote_cmd]
+  ssh_exec_cmd = ["ssh", *ssh_options(ssh_host), ssh_host, "-t", remote_cmd]
   try:
     # Use call instead of run to preserve interactive terminal behavior
-    subprocess.call(ssh_exec_cmd)
+    with trace.process(ssh_exec_cmd) as span:
+      span.attrs["exit_code"] = subprocess.call(ssh_exec_cmd)
   except subprocess.CalledProcessError as e:
     raise RuntimeError(f"Remote execution failed: {e}")
   except KeyboardInterrupt:
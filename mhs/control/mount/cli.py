@@ -1,19 +1,34 @@
 """Mount all configured storage media on all devices."""
 
+from mhs import aio
 from mhs.data.fleet.load.query import LoadFleet
-from mhs.device.server.mount_storage.command import MountStorageCommand
+from mhs.device.server.mount_storage.command import MountServerStorages
+from mhs.output import print_error, print_info
 
 
 def main():
   fleet = LoadFleet().execute()
-  media = fleet.storages
-  servers = fleet.servers._index
-  for server in servers.values():
-    for storage_key in server.mounts:
-      storage = media._index.get(storage_key)
-      if storage:
-        print(f"Mounting storage '{storage.key}' on device '{server.key}'")
-        MountStorageCommand(storage, server).execute()
-        print(f"Successfully mounted storage '{storage.key}' on device '{server.key}'")
-      else:
-        print(f"Warning: Storage '{storage_key}' not found for device '{server.key}'")
+
+  commands: dict[str, MountServerStorages] = {}
+  for storage in fleet.storages._index.values():
+    for server in fleet.get_mounting_servers(storage):
+      commands.setdefault(server.key, MountServerStorages(server)).storages.append(storage)
+
+  if not commands:
+    print_info("No storage to mount")
+    return
+
+  # one probe per server, all servers at once
+  results = aio.run(
+    aio.gather([command.aexecute() for command in commands.values()], return_exceptions=True)
+  )
+
+  failed = 0
+  for server_key, result in zip(commands, results):
+    if isinstance(result, BaseException):
+      result = {storage.key: str(result) for storage in commands[server_key].storages}
+    for storage_key, error in result.items():
+      print_error(f"{storage_key} on {server_key}: {error}")
+      failed += 1
+  if failed:
+    raise RuntimeError(f"Failed to mount {failed} storage(s)")
@@ -2,6 +2,7 @@ from dataclasses import dataclass
 from pathlib import Path
 
 from mhs.device.server.entity import Server
+from mhs.trace import traced
 
 
 @dataclass
@@ -10,7 +11,14 @@ class RunDockerCompose:
   remote_dir: Path
   args: list[str]
 
+  @traced
   def execute(self) -> None:
     from mhs.control.run_docker_compose.handler import handle
 
     handle(self)
+
+  @traced
+  async def aexecute(self) -> None:
+    from mhs.control.run_docker_compose.handler import ahandle
+
+    await ahandle(self)
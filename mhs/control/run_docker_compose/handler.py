@@ -2,14 +2,27 @@ from mhs.control.run_docker_compose.command import RunDockerCompose
 from mhs.ssh.run_on.command import RunOn
 
 
-def handle(command: RunDockerCompose):
-  server = command.server
+def _run_on(command: RunDockerCompose) -> tuple[RunOn, str]:
   args = " ".join(command.args)
   cd_command = f"cd ./{command.remote_dir.as_posix()}"
   dc_command = f"docker compose {args}"
-  output, success = RunOn(
+  run_on = RunOn(
     command.server.ssh_host,
     f"{cd_command} && {dc_command}",
-  ).execute()
+    stream=True,
+  )
+  return run_on, dc_command
+
+
+def handle(command: RunDockerCompose):
+  run_on, dc_command = _run_on(command)
+  output, success = run_on.execute()
+  if not success:
+    raise RuntimeError(f"Failed to run {dc_command} on {command.server}: {output}")
+
+
+async def ahandle(command: RunDockerCompose):
+  run_on, dc_command = _run_on(command)
+  output, success = await run_on.aexecute()
   if not success:
-    raise RuntimeError(f"Failed to run {dc_command} on {server}: {output}")
+    raise RuntimeError(f"Failed to run {dc_command} on {command.server}: {output}")
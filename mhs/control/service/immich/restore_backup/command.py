@@ -1,12 +1,28 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 
+from mhs.trace import traced
+
 
 @dataclass
 class RestoreBackup:
   database_backup_file: Path
-  """rel path from ssh home; must exist on the remote"""
+  """local .sql.gz backup, streamed straight into Postgres on the host"""
+  remote: bool = field(
+    default=False,
+    metadata={"help": "The backup file is already on the host (path relative to ssh home)"},
+  )
+  upload: bool = field(
+    default=False,
+    metadata={"help": "Copy the backup to the host first (resumable, verified), then restore"},
+  )
+
+  def __post_init__(self):
+    self.database_backup_file = Path(self.database_backup_file)
+    if self.remote and self.upload:
+      raise ValueError("remote and upload are mutually exclusive")
 
+  @traced
   def execute(self):
     from mhs.control.service.immich.restore_backup.handler import handle
 
@@ -1,26 +1,193 @@
+import contextvars
+import hashlib
+import shlex
+import subprocess
+import threading
+import time
 from pathlib import Path
 
-from mhs.service.deploy.command import DeployService
+from mhs import trace
 from mhs.control.service.immich.restore_backup.command import RestoreBackup
 from mhs.data.fleet.load.query import LoadFleet
-from mhs.output import print_info, print_success
+from mhs.device.server.entity import Server
+from mhs.output import print_error, print_info, print_output, print_success
+from mhs.service.deploy.command import DeployService
+from mhs.ssh.pool import rsync_shell, ssh_options
 from mhs.ssh.run_on.command import RunOn
 
+SERVICE_DIR = Path("my-home-server") / "etc" / "immich"
+BACKUPS_DIR = Path("my-home-server") / "backups"  # outside SERVICE_DIR, which deploys clear
+CHUNK_SIZE = 1024 * 1024
+# The local pipe and ssh's channel window accept this much before the remote reads anything
+BUFFERED_BYTES = 4 * CHUNK_SIZE
+PROGRESS_INTERVAL = 5.0  # seconds
+
+
+def format_size(size: float) -> str:
+  for unit in ["B", "KiB", "MiB", "GiB"]:
+    if size < 1024:
+      return f"{size:.1f} {unit}"
+    size /= 1024
+  return f"{size:.1f} TiB"
+
+
+class TransferProgress:
+  """Reports bytes sent, throughput and ETA at most every PROGRESS_INTERVAL seconds."""
+
+  def __init__(self, total: int, buffered: int = BUFFERED_BYTES):
+    self.total = total
+    self.buffered = buffered
+    self.sent = 0
+    self.started = 0.0
+    self.timed_from = 0  # bytes already sent when the clock started
+    self.reported = 0.0
+
+  def update(self, sent: int):
+    now = time.monotonic()
+    self.sent += sent
+    if not self.started:
+      if self.sent <= self.buffered:
+        # writes this far may only fill buffers, while the remote waits for Postgres
+        return
+      # past the buffers, each write waits on the remote, so rate and ETA count from here
+      self.started = self.reported = now
+      self.timed_from = self.sent
+    if now - self.reported >= PROGRESS_INTERVAL or self.sent == self.total:
+      self.reported = now
+      print_info(str(self))
+
+  @property
+  def rate(self) -> float:
+    elapsed = time.monotonic() - self.started if self.started else 0
+    return (self.sent - self.timed_from) / elapsed if elapsed else 0.0
+
+  def __str__(self) -> str:
+    percent = 100 * self.sent / self.total if self.total else 100
+    sent = f"Sent {format_size(self.sent)} / {format_size(self.total)} ({percent:.0f}%)"
+    if not (rate := self.rate):
+      return sent
+    eta = (self.total - self.sent) / rate
+    return f"{sent} at {format_size(rate)}/s, ETA {int(eta // 60)}m{int(eta % 60):02d}s"
+
+
+def _restore_command(backup_arg: str) -> str:
+  return f"cd {SERVICE_DIR.as_posix()} && ./restore-backup {backup_arg}"
+
+
+def stream_restore(host: Server, backup_file: Path) -> tuple[str, bool]:
+  """pipes the local backup over SSH into the restore script; returns (last output, success)"""
+  args = ["ssh", *ssh_options(host.ssh_host), host.ssh_host, "-x", _restore_command("-")]
+  with trace.process(args) as span:
+    return _stream_restore(args, backup_file, span)
+
+
+def _stream_restore(args: list[str], backup_file: Path, span: trace.Span) -> tuple[str, bool]:
+  process = subprocess.Popen(
+    args,
+    stdin=subprocess.PIPE,
+    stdout=subprocess.PIPE,
+    stderr=subprocess.STDOUT,
+    text=False,
+  )
+  progress = TransferProgress(backup_file.stat().st_size)
+  errors: list[str] = []
+
+  def send():
+    try:
+      with backup_file.open("rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+          process.stdin.write(chunk)
+          progress.update(len(chunk))
+    except OSError as e:
+      errors.append(str(e))
+    finally:
+      try:
+        process.stdin.close()
+      except OSError:
+        pass
+
+  # the copied context keeps progress lines going to the right client under the agent
+  sender = threading.Thread(target=contextvars.copy_context().run, args=(send,), daemon=True)
+  sender.start()
+
+  last_line = ""
+  for raw_line in process.stdout:
+    last_line = raw_line.decode(errors="replace").rstrip("\n")
+    print_output(last_line)
+  returncode = process.wait()
+  sender.join()
+  span.attrs.update(exit_code=returncode, bytes_out=progress.sent)
+
+  if errors:
+    return f"Stream interrupted after {format_size(progress.sent)}: {errors[0]}", False
+  rate = f" at {format_size(progress.rate)}/s" if progress.rate else ""
+  print_info(f"Streamed {format_size(progress.sent)}{rate}")
+  return last_line, returncode == 0
+
+
+def sha256_file(path: Path) -> str:
+  digest = hashlib.sha256()
+  with path.open("rb") as f:
+    while chunk := f.read(CHUNK_SIZE):
+      digest.update(chunk)
+  return digest.hexdigest()
+
+
+def upload_backup(host: Server, backup_file: Path) -> Path:
+  """copies the backup to the host, resuming a partial copy; returns its path from ssh home"""
+  remote_file = BACKUPS_DIR / backup_file.name
+  output, success = RunOn(host.ssh_host, f"mkdir -p {BACKUPS_DIR.as_posix()}").execute()
+  if not success:
+    raise RuntimeError(f"Failed to create {BACKUPS_DIR} on {host}: {output}")
+
+  rsync_cmd = [
+    "rsync",
+    "--partial",
+    "--append-verify",
+    "--info=progress2",
+    *rsync_shell(host.ssh_host),
+    backup_file.as_posix(),
+    f"{host.ssh_host}:./{remote_file.as_posix()}",
+  ]
+  print_info(f"Uploading {backup_file.name} to {host}...")
+  # no capture, so rsync can draw its progress line on the terminal
+  if trace.run(rsync_cmd, check=False).returncode != 0:
+    raise RuntimeError("Backup upload failed; rerun to resume it")
+
+  print_info("Verifying uploaded backup...")
+  output, success = RunOn(
+    host.ssh_host, f"sha256sum {shlex.quote(remote_file.as_posix())}"
+  ).execute()
+  if not success or output.split()[0] != sha256_file(backup_file):
+    raise RuntimeError(f"Uploaded backup does not match {backup_file}; remove it and rerun")
+  print_success(f"Uploaded and verified {remote_file}")
+  return remote_file
+
 
 def handle(command: RestoreBackup):
   fleet = LoadFleet().execute()
   if not (service := fleet.services._index.get("immich")):
     raise RuntimeError("Immich service is not configured in the fleet")
   host = fleet.get_service_host(service)
-  service_dir = Path("my-home-server") / "etc" / "immich"
-  steps = [
-    f"cd {service_dir.as_posix()}",
-    f"./restore-backup {command.database_backup_file}",
-  ]
 
-  DeployService(service, host, start_service=False).execute()
+  backup_file = command.database_backup_file
+  if not command.remote and not backup_file.is_file():
+    raise RuntimeError(f"Backup file not found: {backup_file}")
+
+  DeployService(service, host=host, start_service=False).execute()
+
+  if command.upload:
+    backup_file = upload_backup(host, backup_file)
+
   print_info(f"Restoring Immich backup on {host.key}...")
-  output, success = RunOn(host.ssh_host, " && ".join(steps)).execute()
-  if success:
-    print_success(output)
-  raise RuntimeError(f"Failed to restore backup: {output}")
+  if command.remote or command.upload:
+    # the script runs from the service dir, but the backup path is relative to ssh home
+    backup_arg = f'"$HOME"/{shlex.quote(backup_file.as_posix())}'
+    output, success = RunOn(host.ssh_host, _restore_command(backup_arg), stream=True).execute()
+  else:
+    output, success = stream_restore(host, backup_file)
+
+  if not success:
+    print_error("Restore failed")
+    raise RuntimeError(f"Failed to restore backup: {output}")
+  print_success(output)
@@ -0,0 +1,40 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from mhs.config import FLEET_FILE
+from mhs.trace import traced
+
+
+@dataclass
+class RenderNginxConfig:
+  """renders the ingress sites (an upstream pool and a server block per route) from the fleet."""
+
+  fleet_file: Path = FLEET_FILE
+  output: Path | None = field(default=None, metadata={"help": "Write the config here"})
+  keepalive: int = field(
+    default=16,
+    metadata={"help": "Idle connections each nginx worker keeps open to every upstream"},
+  )
+  connect_timeout: int = field(
+    default=5,
+    metadata={"help": "Seconds to wait for an upstream to accept a connection"},
+  )
+  cache_zone: str = field(
+    default="mhs_ingress",
+    metadata={"help": "proxy_cache_path zone (defined by ingress init) for cache_paths"},
+  )
+  cache_valid: str = field(
+    default="7d",
+    metadata={"help": "How long cached responses stay fresh (nginx time, e.g. 12h)"},
+  )
+
+  def __post_init__(self):
+    self.fleet_file = Path(self.fleet_file)
+    if self.output is not None:
+      self.output = Path(self.output)
+
+  @traced
+  def execute(self) -> str:
+    from mhs.control.service.ingress.render_nginx_config.handler import handle
+
+    return handle(self)
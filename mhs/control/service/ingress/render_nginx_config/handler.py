@@ -0,0 +1,87 @@
+import re
+
+from mhs.control.service.ingress.render_nginx_config.command import RenderNginxConfig
+from mhs.data.fleet.load.query import LoadFleet
+from mhs.service.entity import Route, Service, ServiceRepo
+
+HEADER = """\
+# Generated by mhs from fleet.json; changes are overwritten by ingress init
+
+# keep upstream connections alive unless the client is upgrading to a websocket
+map $http_upgrade $mhs_connection {
+\tdefault upgrade;
+\t'' '';
+}
+"""
+
+
+def upstream_name(route: Route) -> str:
+  return "mhs_" + re.sub(r"\W", "_", route.service_key)
+
+
+def render_cache_location(command: RenderNginxConfig, route: Route, location: str) -> str:
+  # responses are cached per credential, so one user's thumbnails are never served to another
+  return f"""
+\tlocation {location} {{
+\t\tproxy_pass http://{upstream_name(route)};
+\t\tproxy_cache {command.cache_zone};
+\t\tproxy_cache_key "$host$request_uri|$http_authorization|$http_cookie";
+\t\tproxy_cache_valid 200 {command.cache_valid};
+\t\tproxy_ignore_headers Cache-Control Expires;
+\t\tproxy_cache_lock on;
+\t\tproxy_cache_use_stale error timeout updating;
+\t\tadd_header X-Cache-Status $upstream_cache_status;
+\t}}
+"""
+
+
+def render_route(command: RenderNginxConfig, route: Route, service: Service) -> str:
+  upstream = upstream_name(route)
+  cache_locations = "".join(
+    render_cache_location(command, route, location) for location in service.cache_paths
+  )
+  return f"""
+upstream {upstream} {{
+\tserver {route.upstream_host}:{route.port};
+\tkeepalive {command.keepalive};
+}}
+
+server {{
+\tlisten 80;
+\tserver_name {route.hostname};
+\tclient_max_body_size 4G;
+
+\tproxy_http_version 1.1;
+\tproxy_set_header Host $host;
+\tproxy_set_header X-Real-IP $remote_addr;
+\tproxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+\tproxy_set_header X-Forwarded-Proto $scheme;
+\tproxy_set_header Upgrade $http_upgrade;
+\tproxy_set_header Connection $mhs_connection;
+\tproxy_connect_timeout {command.connect_timeout}s;
+\tproxy_send_timeout {service.proxy_timeout}s;
+\tproxy_read_timeout {service.proxy_timeout}s;
+{cache_locations}
+\tlocation / {{
+\t\tproxy_pass http://{upstream};
+\t}}
+}}
+"""
+
+
+def render_config(command: RenderNginxConfig, routes: list[Route], services: ServiceRepo) -> str:
+  routes = sorted(routes, key=lambda route: route.hostname)
+  return HEADER + "".join(
+    render_route(command, route, services[route.service_key]) for route in routes
+  )
+
+
+def handle(command: RenderNginxConfig) -> str:
+  fleet = LoadFleet(command.fleet_file).execute()
+  config = render_config(command, fleet.get_routes(), fleet.services)
+  if command.output:
+    command.output.parent.mkdir(parents=True, exist_ok=True)
+    command.output.write_text(config)
+  else:
+    print(config, end="")
+  return config
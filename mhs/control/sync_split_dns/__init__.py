@@ -0,0 +1 @@
+"""Points public hostnames at the ingress server for LAN clients, via the router's static DNS."""
@@ -0,0 +1,20 @@
+from dataclasses import dataclass, field
+
+from mhs.trace import traced
+
+
+@dataclass
+class SyncSplitDns:
+  """makes the router's split DNS entries match the fleet's public hostnames in one pass."""
+
+  hostnames: list[str] = field(
+    metadata={"help": "Public hostnames that should resolve to ingress"}
+  )
+  domains: list[str] = field(metadata={"help": "Domains whose static entries are managed"})
+  ingress_hostname: str = "ingress.lan"
+
+  @traced
+  def execute(self) -> bool:
+    from mhs.control.sync_split_dns.handler import handle
+
+    return handle(self)
@@ -0,0 +1,98 @@
+from mhs.config import get_setting
+from mhs.control.sync_split_dns.command import SyncSplitDns
+from mhs.device.discover.tools import quote
+from mhs.output import print_error, print_info, print_success, print_warning
+from mhs.ssh.run_on.command import RunOn
+
+ENTRY_MARKER = "[MHS] dns:"
+TTL = "30m"
+
+
+def is_managed(name: str, domains: list[str]) -> bool:
+  """split DNS entries are the static entries for a managed domain or any of its subdomains"""
+  return any(name == domain or name.endswith(f".{domain}") for domain in domains)
+
+
+def read_static_entries(ssh_host: str) -> list[tuple[str, str]] | None:
+  """returns (name, address) for every named static DNS entry on the router"""
+  cmd = (
+    ":foreach i in=[/ip dns static find where name] do={ :do {"
+    f' :put ("{ENTRY_MARKER}" . [/ip dns static get $i name] . "|" . [/ip dns static get $i address])'
+    " } on-error={} }"
+  )
+  output, success = RunOn(ssh_host, cmd).execute()
+  if not success:
+    print_error(f"Failed to read static DNS entries: {output}")
+    return None
+  entries = []
+  for line in output.splitlines():
+    line = line.strip()
+    if line.startswith(ENTRY_MARKER):
+      name, _, address = line.removeprefix(ENTRY_MARKER).partition("|")
+      entries.append((name, address))
+  return entries
+
+
+def diff_entries(
+  desired: dict[str, str],
+  actual: list[tuple[str, str]],
+  domains: list[str],
+) -> tuple[dict[str, str], dict[str, str], set[str]]:
+  """returns (adds, updates, removes) that turn the actual entries into the desired ones"""
+  current: dict[str, set[str]] = {}
+  for name, address in actual:
+    if is_managed(name, domains):
+      current.setdefault(name, set()).add(address)
+
+  adds = {name: ip for name, ip in desired.items() if name not in current}
+  updates = {name: ip for name, ip in desired.items() if current.get(name, {ip}) != {ip}}
+  removes = {name for name in current if name not in desired}
+  return adds, updates, removes
+
+
+def render_changes(adds: dict[str, str], updates: dict[str, str], removes: set[str]) -> str:
+  """renders the changes as a single RouterOS command line"""
+  commands = []
+  for name in sorted(removes):
+    commands.append(f"/ip dns static remove [find name={quote(name)}]")
+  for name, ip in sorted(updates.items()):
+    commands.append(f"/ip dns static set [find name={quote(name)}] address={quote(ip)}")
+  for name, ip in sorted(adds.items()):
+    commands.append(
+      f"/ip dns static add name={quote(name)} address={quote(ip)} ttl={TTL}"
+      f" comment={quote(f'Split DNS for {name}')}"
+    )
+  return "; ".join(commands)
+
+
+def handle(command: SyncSplitDns) -> bool:
+  """returns True if the router's split DNS entries are in sync"""
+  ssh_host = get_setting("ROUTER_SSH_HOST")
+  if (entries := read_static_entries(ssh_host)) is None:
+    return False
+
+  ingress_ips = {address for name, address in entries if name == command.ingress_hostname}
+  if len(ingress_ips) != 1:
+    print_warning(
+      f"Could not configure split DNS: {command.ingress_hostname} has {len(ingress_ips)} "
+      "static addresses (you may have ingress issues on LAN)"
+    )
+    return False
+  ingress_ip = ingress_ips.pop()
+
+  desired = {hostname: ingress_ip for hostname in command.hostnames}
+  adds, updates, removes = diff_entries(desired, entries, command.domains)
+  if not (adds or updates or removes):
+    print_info("Split DNS is up to date")
+    return True
+
+  output, success = RunOn(ssh_host, render_changes(adds, updates, removes)).execute()
+  if not success:
+    print_error(f"Failed to sync split DNS: {output}")
+    return False
+
+  for name in sorted(removes):
+    print_success(f"Removed split DNS for {name}")
+  for name in sorted(adds | updates):
+    print_success(f"Configured split DNS for {name} to {ingress_ip}")
+  return True
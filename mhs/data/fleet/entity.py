@@ -1,8 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from mhs.device.server.entity import Server, ServerRepo
-from mhs.device.storage.entity import StorageRepo
-from mhs.service.entity import Service, ServiceRef, ServiceRepo
+from mhs.device.storage.entity import Storage, StorageRef, StorageRepo
+from mhs.service.entity import Route, Service, ServiceRepo
 
 
 @dataclass
@@ -10,14 +10,64 @@ class Fleet:
   servers: ServerRepo
   storages: StorageRepo
   services: ServiceRepo
+  domains: dict[str, str] = field(default_factory=dict)
+  """domain key -> domain name"""
+  _mounts: dict[StorageRef, list[Server]] = field(init=False, repr=False)
+  _macs: dict[str, list[Server]] = field(init=False, repr=False)
+  _public_hostnames: dict[str, list[str]] = field(init=False, repr=False)
+  _routes: list[Route] = field(init=False, repr=False)
+
+  def __post_init__(self):
+    self._mounts = {}
+    self._macs = {}
+    self._public_hostnames = {key: [] for key in self.domains}
+    self._routes = []
+
+    for server in self.servers:
+      for storage_key in server.mounts:
+        self._mounts.setdefault(StorageRef(storage_key), []).append(server)
+      for mac in filter(None, [server.primary_mac, server.secondary_mac]):
+        self._macs.setdefault(mac.upper(), []).append(server)
+
+    for service in self.services._index.values():
+      if (domain := self.domains.get(service.domain_key)) and service.subdomain:
+        hostname = f"{service.subdomain}.{domain}"
+        self._public_hostnames[service.domain_key].append(hostname)
+        if host := self.servers.get_host(service):
+          self._routes.append(Route(hostname, service.key, host.hostname, service.port))
+
+  def freeze(self):
+    """makes the repos read-only; a loaded fleet is cached and shared by every caller"""
+    for repo in [self.servers, self.storages, self.services]:
+      repo.freeze()
 
   def get_service_host(self, service: Service, default: Server | None = None) -> Server:
-    service_ref = ServiceRef(service)
-    for server in self.servers._index.values():
-      if server.services.get(service_ref):
-        return server
+    if server := self.servers.get_host(service):
+      return server
 
     if default is not None:
       return default
 
     raise RuntimeError(f"No host found for service {service}")
+
+  def get_mounting_servers(self, storage: Storage | StorageRef | str) -> list[Server]:
+    """returns the servers that mount the storage"""
+    if isinstance(storage, Storage):
+      storage = storage.key
+    if not isinstance(storage, StorageRef):
+      storage = StorageRef(storage)
+    return list(self._mounts.get(storage, []))
+
+  def get_servers_by_mac(self, mac: str) -> list[Server]:
+    """returns the servers with the given primary or secondary MAC address"""
+    return list(self._macs.get(mac.upper(), []))
+
+  def get_routes(self) -> list[Route]:
+    """returns how to reach each public service: public hostname -> LAN host and port"""
+    return list(self._routes)
+
+  def get_public_hostnames(self, domain_key: str | None = None) -> list[str]:
+    """returns the public hostnames of services on the domain, or on every domain"""
+    if domain_key is None:
+      return [hostname for hostnames in self._public_hostnames.values() for hostname in hostnames]
+    return list(self._public_hostnames.get(domain_key, []))
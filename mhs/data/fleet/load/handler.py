@@ -1,15 +1,30 @@
 import json
 import sys
+import threading
+from pathlib import Path
 
 from mhs.config import DOMAIN_SUFFIX
 from mhs.data.fleet.entity import Fleet
 from mhs.data.fleet.load.query import LoadFleet
 from mhs.device.server.entity import Server, ServerRepo
-from mhs.device.storage.entity import Storage, StorageRepo
+from mhs.device.storage.entity import Storage, StorageRef, StorageRepo
 from mhs.output import print_error, print_warning
 from mhs.service.entity import Service, ServiceRepo
 from mhs.tools import validate_mac_address
 
+_cache_lock = threading.Lock()
+_cache: dict[tuple[Path, str, str], tuple[tuple[int, int], Fleet]] = {}
+"""(fleet file, servers key, storages key) -> ((mtime, size), fleet)"""
+
+
+def parse_domains(fleet: dict, data_key: str = "domains") -> dict[str, str]:
+  """returns {domain key: domain} for every domain with a configured domain name"""
+  domains: dict[str, str] = {}
+  for key, props in fleet.get(data_key, {}).items():
+    if domain := props.get("domain"):
+      domains[key] = domain
+  return domains
+
 
 def parse_services(data: dict, data_key: str = "services") -> ServiceRepo:
   services = ServiceRepo()
@@ -53,22 +68,22 @@ def parse_storages(fleet: dict, data_key: str = "storages") -> StorageRepo:
   return storages
 
 
-def handle(query: LoadFleet) -> Fleet:
-  fleet_file = query.fleet_file.resolve()
-
-  if not fleet_file.exists():
-    raise RuntimeError(f"Fleet file does not exist: {fleet_file}")
-
+def parse_fleet(fleet_file: Path, servers_key: str, storages_key: str) -> Fleet:
   try:
     fleet = json.loads(fleet_file.read_text())
   except json.JSONDecodeError as e:
     raise RuntimeError(f"Failed to load fleet from {fleet_file}: {e}")
 
-  storages = parse_storages(fleet, query.storages_key)
-  servers = parse_servers(fleet, query.servers_key)
+  storages = parse_storages(fleet, storages_key)
+  servers = parse_servers(fleet, servers_key)
+
+  for server in servers:
+    for storage_key in server.mounts:
+      if StorageRef(storage_key) not in storages._index:
+        print_warning(f"Storage '{storage_key}' not found for device '{server.key}'")
 
   services = ServiceRepo()
-  for server in servers._index.values():
+  for server in servers:
     for service_key, service in server.services._index.items():
       if service_key not in services._index:
         services[service_key] = service
@@ -77,4 +92,31 @@ def handle(query: LoadFleet) -> Fleet:
     servers=servers,
     storages=storages,
     services=services,
+    domains=parse_domains(fleet),
   )
+
+
+def handle(query: LoadFleet) -> Fleet:
+  """Returns the parsed fleet, re-parsing only if the file changed since it was last loaded.
+
+  The fleet is shared by every caller (for as long as the agent runs), so its repos are
+  read-only; don't mutate the servers, services or storages in it either.
+  """
+  fleet_file = query.fleet_file.resolve()
+
+  if not fleet_file.exists():
+    raise RuntimeError(f"Fleet file does not exist: {fleet_file}")
+
+  stat = fleet_file.stat()
+  version = (stat.st_mtime_ns, stat.st_size)
+  cache_key = (fleet_file, query.servers_key, query.storages_key)
+
+  with _cache_lock:
+    cached = _cache.get(cache_key)
+    if cached and cached[0] == version:
+      return cached[1]
+
+    fleet = parse_fleet(fleet_file, query.servers_key, query.storages_key)
+    fleet.freeze()
+    _cache[cache_key] = (version, fleet)
+    return fleet
@@ -3,6 +3,7 @@ from pathlib import Path
 
 from mhs.config import FLEET_FILE
 from mhs.data.fleet.entity import Fleet
+from mhs.trace import traced
 
 
 @dataclass
@@ -19,7 +20,13 @@ class LoadFleet:
   def __str__(self) -> str:
     return self.fleet_file.as_posix()
 
+  @traced
   def execute(self) -> Fleet:
     from mhs.data.fleet.load.handler import handle
 
     return handle(self)
+
+  async def aexecute(self) -> Fleet:
+    from mhs.aio import to_thread
+
+    return await to_thread(self.execute)
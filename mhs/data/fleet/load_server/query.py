@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 
 from mhs.device.server.entity import Server, ServerRef
+from mhs.trace import traced
 
 
 @dataclass
@@ -14,7 +15,13 @@ class LoadServer:
     if not isinstance(self.ref, ServerRef):
       self.ref = ServerRef(self.ref)
 
+  @traced
   def execute(self) -> Server:
     from mhs.data.fleet.load_server.handler import handle
 
     return handle(self)
+
+  async def aexecute(self) -> Server:
+    from mhs.aio import to_thread
+
+    return await to_thread(self.execute)
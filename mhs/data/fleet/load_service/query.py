@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 
 from mhs.service.entity import Service, ServiceRef
+from mhs.trace import traced
 
 
 @dataclass
@@ -14,7 +15,13 @@ class LoadService:
     if not isinstance(self.ref, ServiceRef):
       self.ref = ServiceRef(self.ref)
 
+  @traced
   def execute(self) -> Service:
     from mhs.data.fleet.load_service.handler import handle
 
     return handle(self)
+
+  async def aexecute(self) -> Service:
+    from mhs.aio import to_thread
+
+    return await to_thread(self.execute)
@@ -0,0 +1,21 @@
+from mhs.data.fleet.load.query import LoadFleet
+from mhs.data.fleet.resolve_routes.query import ResolveRoutes
+from mhs.service.entity import Route
+
+
+def render_routes(routes: list[Route]) -> str:
+  """one `hostname|upstream host|port|service key` line per route, for `IFS='|' read` in bash"""
+  return "".join(
+    f"{route.hostname}|{route.upstream_host}|{route.port}|{route.service_key}\n"
+    for route in routes
+  )
+
+
+def handle(query: ResolveRoutes) -> list[Route]:
+  routes = LoadFleet(query.fleet_file).execute().get_routes()
+  if query.output:
+    query.output.parent.mkdir(parents=True, exist_ok=True)
+    query.output.write_text(render_routes(routes))
+  else:
+    print(render_routes(routes), end="")
+  return routes
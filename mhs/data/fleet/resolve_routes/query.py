@@ -0,0 +1,28 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from mhs.config import FLEET_FILE
+from mhs.service.entity import Route
+from mhs.trace import traced
+
+
+@dataclass
+class ResolveRoutes:
+  """resolves the ingress routing table (public hostname -> LAN host -> port) from the fleet."""
+
+  fleet_file: Path = FLEET_FILE
+  output: Path | None = field(
+    default=None,
+    metadata={"help": "Write the table here (hostname|host|port|service per line)"},
+  )
+
+  def __post_init__(self):
+    self.fleet_file = Path(self.fleet_file)
+    if self.output is not None:
+      self.output = Path(self.output)
+
+  @traced
+  def execute(self) -> list[Route]:
+    from mhs.data.fleet.resolve_routes.handler import handle
+
+    return handle(self)
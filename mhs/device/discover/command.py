@@ -1,6 +1,7 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from mhs.device.server.entity import ServerRef
+from mhs.trace import traced
 
 
 @dataclass
@@ -9,7 +10,74 @@ class DiscoverDevice:
 
   ref: ServerRef
 
-  def execute(self):
+  @traced
+  def execute(self) -> bool:
     from mhs.device.discover.handler import handle
 
     return handle(self)
+
+  async def aexecute(self) -> bool:
+    from mhs.aio import to_thread
+
+    return await to_thread(self.execute)
+
+
+@dataclass
+class DiscoverDeviceBatch:
+  """deploys discovery for several devices with a single script bundle imported on the router."""
+
+  refs: list[ServerRef] = field(default_factory=list)
+
+  def __post_init__(self):
+    self.refs = [ref if isinstance(ref, ServerRef) else ServerRef(ref) for ref in self.refs]
+
+  @traced
+  def execute(self) -> dict[str, str]:
+    from mhs.device.discover.handler import handle_batch
+
+    return handle_batch(self)
+
+  async def aexecute(self) -> dict[str, str]:
+    from mhs.aio import to_thread
+
+    return await to_thread(self.execute)
+
+
+@dataclass
+class DiscoverFleet:
+  """deploys one script, run by one scheduler, that discovers every device in the fleet."""
+
+  lease_events: bool = field(
+    default=False,
+    metadata={
+      "help": "Also run it when the router binds a DHCP lease to a fleet MAC, polling only"
+      " every FALLBACK_SCHEDULE_INTERVAL"
+    },
+  )
+
+  @traced
+  def execute(self) -> dict[str, str]:
+    from mhs.device.discover.handler import handle_fleet
+
+    return handle_fleet(self)
+
+  async def aexecute(self) -> dict[str, str]:
+    from mhs.aio import to_thread
+
+    return await to_thread(self.execute)
+
+
+@dataclass
+class RemoveFleetDiscovery:
+  """removes the consolidated discovery script, its scheduler and its DHCP lease hook."""
+
+  @traced
+  def execute(self) -> bool:
+    from mhs.device.discover.handler import handle_remove_fleet
+
+    return handle_remove_fleet(self)
+
+  async def aexecute(self) -> bool:
+    from mhs.aio import to_thread
+
+    return await to_thread(self.execute)
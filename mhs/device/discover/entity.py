@@ -0,0 +1,32 @@
+import hashlib
+from dataclasses import dataclass
+
+TAG_PREFIX = "[MHS:"
+
+
+@dataclass
+class DiscoveryScript:
+  """a system script on the router, plus the scheduler entry that runs it"""
+
+  name: str
+  source: str
+  description: str
+  schedule_spec: str
+
+  def __str__(self) -> str:
+    return self.name
+
+  @property
+  def schedule_name(self) -> str:
+    return f"{self.name}_schedule"
+
+  @property
+  def digest(self) -> str:
+    """fingerprint of everything installed on the router for this script"""
+    content = f"{self.name}\0{self.source}\0{self.description}\0{self.schedule_spec}"
+    return hashlib.sha256(content.encode()).hexdigest()[:12]
+
+  @property
+  def comment(self) -> str:
+    """router comment; tags the entry as managed by MHS and records its digest"""
+    return f"{self.description} {TAG_PREFIX}{self.digest}]"
@@ -1,69 +1,41 @@
-import json
 import os
-import shlex
-import subprocess
-import sys
 import tempfile
 from pathlib import Path
 
-from mhs import LOCAL_ROOT
+from mhs import LOCAL_ROOT, trace
+from mhs.config import get_env, get_setting
 from mhs.data.fleet.load.query import LoadFleet
 from mhs.data.fleet.load_server.query import LoadServer
 from mhs.device.discover import tools
-from mhs.device.discover.command import DiscoverDevice
+from mhs.device.discover.command import (
+  DiscoverDevice,
+  DiscoverDeviceBatch,
+  DiscoverFleet,
+  RemoveFleetDiscovery,
+)
+from mhs.device.discover.entity import DiscoveryScript
 from mhs.device.server.entity import Server
 from mhs.output import print_error, print_info, print_success, print_warning
+from mhs.ssh.pool import ssh_options
 from mhs.ssh.run_on.command import RunOn
 
 DEBUG = os.getenv("MHS_DEBUG", "0") == "1"
 DEVICE_SCRIPT_CACHE_DIR = LOCAL_ROOT / ".device-scripts"
-FLEET_FILE = LOCAL_ROOT / "fleet.json"
-EXAMPLE_ENV_FILE = LOCAL_ROOT / "example.env"
-ENV_FILE = LOCAL_ROOT / ".env"
+FLEET_SCRIPT_NAME = "discover-fleet"
+DEFAULT_FALLBACK_SCHEDULE_INTERVAL = "01:00:00"
 
 
-def ensure_env_file() -> None:
-  if not ENV_FILE.exists():
-    ENV_FILE.write_text(EXAMPLE_ENV_FILE.read_text())
-    print(f"Created default .env file at {ENV_FILE}. Customize it as necessary, then rerun.")
-    sys.exit(0)
+def router_ssh_host() -> str:
+  return get_setting("ROUTER_SSH_HOST")
 
 
-def load_env_file(filepath: Path) -> dict[str, str]:
-  env_vars = {}
-  if not filepath.exists():
-    return env_vars
+def schedule_interval() -> str:
+  return get_setting("SCHEDULE_INTERVAL")
 
-  for line in filepath.read_text().splitlines():
-    line = line.strip()
-    # Skip empty lines and comments
-    if not line or line.startswith("#"):
-      continue
-    # Parse KEY=VALUE
-    if "=" in line:
-      key, value = line.split("=", 1)
-      env_vars[key.strip()] = value.strip()
 
-  return env_vars
-
-
-def load_config(source_dir: Path) -> dict[str, str]:
-  """Load configuration from service .env file with environment variable overrides."""
-  config = load_env_file(source_dir / ".env")
-
-  # Environment variables override .env values
-  for key in config:
-    if key in os.environ:
-      config[key] = os.environ[key]
-
-  return config
-
-
-ensure_env_file()
-CONFIG = load_config(LOCAL_ROOT)
-ROUTER_SSH_HOST = CONFIG["ROUTER_SSH_HOST"]
-SCHEDULE_INTERVAL = CONFIG["SCHEDULE_INTERVAL"]
-DOMAIN_SUFFIX = CONFIG["DOMAIN_SUFFIX"]
+def fallback_schedule_interval() -> str:
+  """how often to poll when DHCP lease events trigger discovery"""
+  return get_env().get("FALLBACK_SCHEDULE_INTERVAL", DEFAULT_FALLBACK_SCHEDULE_INTERVAL)
 
 
 def run_on_router(command: str, as_script=False) -> tuple[str, bool]:
@@ -78,17 +50,18 @@ def run_on_router(command: str, as_script=False) -> tuple[str, bool]:
       temp_script.write(command)
       temp_script_path = Path(temp_script.name)
     if script_name := _upload_script_to_router(temp_script_path):
-      command = f"/import {shlex.quote(script_name)}; /file remove [find where name={shlex.quote(script_name)}]"
+      command = tools.render_import(script_name)
     temp_script_path.unlink(missing_ok=True)
   return RunOn(
-    ROUTER_SSH_HOST,
+    router_ssh_host(),
     command,
   ).execute()
 
 
 def _upload_script_to_router(script_file: Path, name: str = "") -> str:
   """returns the script name if it was uploaded successfully"""
-  print_info(f"Uploading '{script_file.name}' to {ROUTER_SSH_HOST}...")
+  ssh_host = router_ssh_host()
+  print_info(f"Uploading '{script_file.name}' to {ssh_host}...")
   real_path = script_file.resolve()
   if not real_path.exists():
     print_error(f"Script file '{script_file}' does not exist")
@@ -96,9 +69,14 @@ def _upload_script_to_router(script_file: Path, name: str = "") -> str:
 
   if not name:
     name = f"{script_file.stem}.rsc"
-  scp_cmd = ["scp", real_path.as_posix(), f"{ROUTER_SSH_HOST}:/{name}"]
+  scp_cmd = [
+    "scp",
+    *ssh_options(ssh_host),
+    real_path.as_posix(),
+    f"{ssh_host}:/{name}",
+  ]
   try:
-    subprocess.run(scp_cmd, capture_output=True, text=True, check=True)
+    trace.run(scp_cmd, capture_output=True, text=True, check=True)
     print_success(f"Uploaded '{script_file.name}' to router")
     return name
   except Exception as e:
@@ -106,35 +84,8 @@ def _upload_script_to_router(script_file: Path, name: str = "") -> str:
     return ""
 
 
-def upload_script_to_router(
-  script_file: Path,
-  script_comment: str,
-  run=False,
-) -> bool:
-  """Upload script file to router and create system script referencing the file."""
-  if not (script_name := _upload_script_to_router(script_file)):
-    return False
-
-  # Create or update system script referencing the uploaded file
-  print_info(f"Installing system script '{script_file.stem}'...")
-  cmd = (
-    f"{{:local src [/file get {script_name} contents]; "
-    f':local sid [/system script find name="{script_file.stem}"]; '
-    f':if ([:len $sid] > 0) do={{ /system script set $sid source=$src comment="{script_comment}" }} '
-    f'else={{ /system script add name="{script_file.stem}" source=$src comment="{script_comment}" }} }}'
-  )
-  run_on_router(cmd)
-  print_success(f"System script '{script_file.stem}' installed")
-
-  if run:
-    run_on_router(f'/system script run "{script_file.stem}"')
-
-  return True
-
-
-def create_schedule(script_name: str, schedule_spec: str, user="admin") -> bool:
-  """Set up a scheduler entry to run the script."""
-  # Validate format: hh:mm:ss
+def validate_schedule_spec(schedule_spec: str) -> bool:
+  """Validate format: hh:mm:ss"""
   parts = schedule_spec.split(":")
   if len(parts) != 3:
     print_error(
@@ -154,47 +105,200 @@ def create_schedule(script_name: str, schedule_spec: str, user="admin") -> bool:
     )
     return False
 
-  schedule_name = f"{script_name}_schedule"
+  return True
 
-  # Remove existing schedule if it exists
-  run_on_router(f'/system scheduler remove [find name="{schedule_name}"]')
 
-  # Add new schedule
-  run_on_router(
-    f'/system scheduler add name="{schedule_name}" on-event="/system script run \\"{script_name}\\"" interval="{schedule_spec}"',
-  )
+def import_bundle(bundle_file: Path) -> tuple[str, bool]:
+  """uploads a script bundle and applies it with /import"""
+  if not (bundle_name := _upload_script_to_router(bundle_file)):
+    return "Bundle upload failed", False
 
-  return True
+  output, success = RunOn(
+    router_ssh_host(),
+    tools.render_import(bundle_name),
+  ).execute()
+  if DEBUG:
+    print_info(output)
+  return output, success
+
+
+def fetch_installed() -> dict[str, str] | None:
+  """returns {script name: digest} for MHS-tagged entries on the router, or None on failure"""
+  output, success = run_on_router(tools.render_list_installed())
+  if not success:
+    print_error(f"Failed to read installed scripts from {router_ssh_host()}: {output}")
+    return None
+  return tools.parse_installed(output)
+
+
+def reconcile(
+  desired: list[DiscoveryScript],
+  installed: dict[str, str],
+  bundle_name: str = "discover-bundle",
+  prune_prefix: str = "",
+) -> dict[str, str]:
+  """pushes only the scripts whose installed digest differs; returns an error per failed script.
+
+  Installed scripts whose names start with `prune_prefix` but are not desired are removed.
+  """
+  stale = [script for script in desired if installed.get(script.name) != script.digest]
+  desired_names = {script.name for script in desired}
+  orphans = []
+  if prune_prefix:
+    orphans = [
+      name for name in installed if name.startswith(prune_prefix) and name not in desired_names
+    ]
+
+  for script in desired:
+    if script not in stale:
+      print_info(f"{script} is up to date")
+
+  if not stale and not orphans:
+    return {}
+
+  blocks = [tools.render_install(script, run=True) for script in stale]
+  blocks.extend(tools.render_remove(name) for name in orphans)
 
+  DEVICE_SCRIPT_CACHE_DIR.mkdir(exist_ok=True)
+  bundle_file = DEVICE_SCRIPT_CACHE_DIR / f"{bundle_name}.rsc"
+  bundle_file.write_text(f"# Generated by {__file__}\n" + "\n".join(blocks) + "\n")
 
-def handle(command: DiscoverDevice):
-  device = LoadServer(command.ref).execute()
-  print(f"Discovering {device}...")
+  output, success = import_bundle(bundle_file)
+  if not success:
+    return {script.name: f"Bundle import failed: {output}" for script in stale}
 
-  DEVICE_SCRIPT_CACHE_DIR.mkdir(exist_ok=True)
+  failed = set(tools.parse_failures(output))
+  for script in stale:
+    if script.name not in failed:
+      print_success(f"Deployed {script} to {router_ssh_host()}")
+  for name in orphans:
+    print_info(f"Removed {name} from {router_ssh_host()}")
+  return {name: "Script install failed" for name in failed}
 
-  name = device.description.strip() or device.key
 
-  script_name = f"discover-{device.key}"
-  script_file = DEVICE_SCRIPT_CACHE_DIR / f"{script_name}.rsc"
-  script_comment = f"Discover {name} ({device.hostname})"
-  script_content = tools.generate_device_discovery_script(
-    device.hostname,
-    device.primary_mac,
-    device.secondary_mac,
-  )
+def cache_script(script: DiscoveryScript):
+  """keeps a copy of the script in the local cache"""
+  DEVICE_SCRIPT_CACHE_DIR.mkdir(exist_ok=True)
+  script_file = DEVICE_SCRIPT_CACHE_DIR / f"{script.name}.rsc"
   try:
-    script_file.write_text(script_content)
+    script_file.write_text(script.source)
     print_info(f"Generated {script_file.relative_to(LOCAL_ROOT)}")
   except Exception as e:
-    raise RuntimeError(f"Failed to generate script for {name}: {e}")
+    raise RuntimeError(f"Failed to generate script {script}: {e}")
 
-  if upload_script_to_router(script_file, script_comment, run=True):
-    if create_schedule(script_file.stem, SCHEDULE_INTERVAL):
-      print_success(f"Deployed {script_file.stem} to {ROUTER_SSH_HOST}")
-    else:
-      print_error(f"Failed to schedule {script_file.stem}")
-  else:
-    print_error(f"Failed to deploy {script_name}")
 
-  print("Done.")
+def device_macs(device: Server) -> list[str]:
+  return [mac for mac in [device.primary_mac, device.secondary_mac] if mac]
+
+
+def generate_script(device: Server) -> DiscoveryScript:
+  """builds the device's discovery script, keeping a copy in the local cache"""
+  name = device.description.strip() or device.key
+
+  script = DiscoveryScript(
+    name=f"discover-{device.key}",
+    source=tools.generate_discovery_script({device.hostname: device_macs(device)}),
+    description=f"Discover {name} ({device.hostname})",
+    schedule_spec=schedule_interval(),
+  )
+  cache_script(script)
+  return script
+
+
+def generate_fleet_script(devices: list[Server], schedule_spec: str) -> DiscoveryScript:
+  """builds one discovery script covering every device, keeping a copy in the local cache"""
+  script = DiscoveryScript(
+    name=FLEET_SCRIPT_NAME,
+    source=tools.generate_discovery_script(
+      {device.hostname: device_macs(device) for device in devices}
+    ),
+    description=f"Discover {len(devices)} fleet devices",
+    schedule_spec=schedule_spec,
+  )
+  cache_script(script)
+  return script
+
+
+def handle(command: DiscoverDevice) -> bool:
+  """returns True if the discovery script is installed and scheduled on the router"""
+  if not validate_schedule_spec(schedule_interval()):
+    return False
+
+  device = LoadServer(command.ref).execute()
+  print(f"Discovering {device}...")
+
+  script = generate_script(device)
+  if (installed := fetch_installed()) is None:
+    return False
+
+  if failures := reconcile([script], installed, bundle_name=f"{script.name}-bundle"):
+    print_error(f"Failed to deploy {script}: {failures[script.name]}")
+    return False
+  return True
+
+
+def handle_batch(command: DiscoverDeviceBatch) -> dict[str, str]:
+  """returns an error message per device that failed"""
+  if not validate_schedule_spec(schedule_interval()):
+    return {ref.key: "Invalid schedule" for ref in command.refs}
+
+  fleet = LoadFleet().execute()
+  devices = [fleet.servers[ref] for ref in command.refs]
+  print(f"Discovering {len(devices)} devices in one batch...")
+
+  scripts = {device.key: generate_script(device) for device in devices}
+  if (installed := fetch_installed()) is None:
+    return {device.key: "Failed to read router state" for device in devices}
+
+  failures = reconcile(list(scripts.values()), installed, prune_prefix="discover-")
+  return {key: failures[script.name] for key, script in scripts.items() if script.name in failures}
+
+
+def set_lease_hook(hook: str) -> bool:
+  """sets (or with an empty hook, clears) the discovery lease-script on the DHCP servers"""
+  output, success = run_on_router(tools.render_set_lease_hook(hook), as_script=True)
+  if not success:
+    print_error(f"Failed to update the DHCP lease hook on {router_ssh_host()}: {output}")
+    return False
+  for server_name in tools.parse_skipped_lease_hooks(output):
+    print_warning(f"DHCP server {server_name} already has a lease-script; not hooking discovery")
+  return True
+
+
+def handle_fleet(command: DiscoverFleet) -> dict[str, str]:
+  """returns an error message per device that failed"""
+  fleet = LoadFleet().execute()
+  devices = list(fleet.servers)
+  # with lease events doing the work, polling is only a fallback for missed events
+  schedule_spec = fallback_schedule_interval() if command.lease_events else schedule_interval()
+  if not validate_schedule_spec(schedule_spec):
+    return {device.key: "Invalid schedule" for device in devices}
+
+  print(f"Discovering {len(devices)} devices with one script...")
+  script = generate_fleet_script(devices, schedule_spec)
+  if (installed := fetch_installed()) is None:
+    return {device.key: "Failed to read router state" for device in devices}
+
+  # the per-device discover-<key> scripts and schedulers this replaces are pruned
+  failures = reconcile(
+    [script], installed, bundle_name=f"{script.name}-bundle", prune_prefix="discover-"
+  )
+  if error := failures.get(script.name):
+    return {device.key: error for device in devices}
+
+  hook = ""
+  if command.lease_events:
+    macs = sorted({mac.upper() for device in devices for mac in device_macs(device)})
+    hook = tools.render_lease_hook(script.name, macs)
+  if not set_lease_hook(hook) and command.lease_events:
+    return {device.key: "Failed to set DHCP lease hook" for device in devices}
+  return {}
+
+
+def handle_remove_fleet(command: RemoveFleetDiscovery) -> bool:
+  """returns True if the router no longer runs consolidated discovery"""
+  commands = "\n".join([tools.render_remove(FLEET_SCRIPT_NAME), tools.render_set_lease_hook("")])
+  output, success = run_on_router(commands, as_script=True)
+  if not success:
+    print_error(f"Failed to remove {FLEET_SCRIPT_NAME} from {router_ssh_host()}: {output}")
+  return success
@@ -1,10 +1,183 @@
+import re
+
 from mhs.device.discover import TEMPLATES_DIR
+from mhs.device.discover.entity import TAG_PREFIX, DiscoveryScript
+
+FAILURE_MARKER = "[MHS] failed:"
+INSTALLED_MARKER = "[MHS] installed:"
+LEASE_HOOK_MARKER = "MHS discovery lease hook"
+LEASE_HOOK_SKIPPED_MARKER = "[MHS] lease hook skipped:"
+_TAG_PATTERN = re.compile(re.escape(TAG_PREFIX) + r"([0-9a-f]+)\]")
+
+_ESCAPES = {
+  "\\": "\\\\",
+  '"': '\\"',
+  "$": "\\$",
+  "?": "\\?",
+  "\t": "\\t",
+  "\r": "",
+}
+
 
+def render_array(values: list[str]) -> str:
+  # an empty {} is not an array literal RouterOS accepts
+  return "{" + ";".join(quote(value) for value in values) + "}" if values else '[:toarray ""]'
 
-def generate_device_discovery_script(hostname: str, primary_mac: str, secondary_mac: str) -> str:
+
+def generate_discovery_script(devices: dict[str, list[str]]) -> str:
+  """renders a script that discovers every device ({hostname: MACs, primary first}) in one run"""
   template = TEMPLATES_DIR / "discovery-script.rsc"
-  script = template.read_text()
-  script = script.replace("{{hostname}}", hostname)
-  script = script.replace("{{primary_mac}}", primary_mac)
-  script = script.replace("{{secondary_mac}}", secondary_mac)
+  rows = "\n".join(
+    f":set ($devices->{quote(hostname)}) {render_array([mac.upper() for mac in macs])}"
+    for hostname, macs in devices.items()
+  )
+  script = template.read_text().replace("{{devices}}", rows)
   return f"# Generated by {__file__}\n{script}"
+
+
+def quote(value: str) -> str:
+  """renders a RouterOS string literal, continuing it across lines the way /export does"""
+  lines = ["".join(_ESCAPES.get(char, char) for char in line) for line in value.split("\n")]
+  return '"' + "\\\n    \\n".join(lines) + '"'
+
+
+def render_import(file_name: str) -> str:
+  """renders RouterOS commands that run an uploaded script file, then delete it"""
+  return f"/import {quote(file_name)}; /file remove [find where name={quote(file_name)}]"
+
+
+def render_install(script: DiscoveryScript, run=False) -> str:
+  """renders RouterOS commands that create or update a system script and its scheduler entry.
+
+  Errors are caught so one bad entry doesn't abort the rest of an imported bundle;
+  failures are reported on a line starting with FAILURE_MARKER.
+  """
+  on_event = quote(f'/system script run "{script.name}"')
+  comment = quote(script.comment)
+  lines = [
+    ":do {",
+    f"  :local src {quote(script.source)}",
+    f"  :local sid [/system script find name={quote(script.name)}]",
+    "  :if ([:len $sid] > 0) do={",
+    f"    /system script set $sid source=$src comment={comment}",
+    "  } else={",
+    f"    /system script add name={quote(script.name)} source=$src comment={comment}",
+    "  }",
+    f"  :local eid [/system scheduler find name={quote(script.schedule_name)}]",
+    "  :if ([:len $eid] > 0) do={",
+    (
+      f"    /system scheduler set $eid on-event={on_event}"
+      f" interval={quote(script.schedule_spec)} comment={comment}"
+    ),
+    "  } else={",
+    (
+      f"    /system scheduler add name={quote(script.schedule_name)} on-event={on_event}"
+      f" interval={quote(script.schedule_spec)} comment={comment}"
+    ),
+    "  }",
+  ]
+  if run:
+    lines.append(f"  /system script run {quote(script.name)}")
+  lines.append(f"}} on-error={{ :put {quote(f'{FAILURE_MARKER} {script.name}')} }}")
+  return "\n".join(lines)
+
+
+def render_remove(script_name: str) -> str:
+  """renders RouterOS commands that remove a system script and its scheduler entry"""
+  return "\n".join(
+    [
+      f"/system scheduler remove [find name={quote(f'{script_name}_schedule')}]",
+      f"/system script remove [find name={quote(script_name)}]",
+    ]
+  )
+
+
+def render_list_installed() -> str:
+  """renders a RouterOS command that prints every MHS-tagged script and scheduler entry"""
+  tag = quote(re.escape(TAG_PREFIX))
+  return "; ".join(
+    f":foreach i in=[{menu} find where comment~{tag}] do={{"
+    f' :put ("{INSTALLED_MARKER} {kind}|" . [{menu} get $i name] . "|" . [{menu} get $i comment])'
+    " }"
+    for kind, menu in [("script", "/system script"), ("scheduler", "/system scheduler")]
+  )
+
+
+def render_lease_hook(script_name: str, macs: list[str]) -> str:
+  """renders a DHCP lease-script that runs the discovery script when a fleet MAC is bound"""
+  is_fleet_mac = f'[:typeof [:find {render_array(macs)} $leaseActMAC]] != "nil"'
+  return "\n".join(
+    [
+      f"# {LEASE_HOOK_MARKER}",
+      f':if ($leaseBound = "1" && {is_fleet_mac}) do={{',
+      f"  :if ([:len [/system script find name={quote(script_name)}]] > 0) do={{",
+      "    # give the device a moment to bring up its address before it is pinged",
+      "    :delay 3s",
+      f"    /system script run {quote(script_name)}",
+      "  }",
+      "}",
+    ]
+  )
+
+
+def render_set_lease_hook(hook: str) -> str:
+  """renders RouterOS commands that set (or with an empty hook, clear) the lease-script of
+  every DHCP server whose lease-script is empty or an MHS hook, writing only on change"""
+  is_ours = f'[:typeof [:find $current {quote(LEASE_HOOK_MARKER)}]] != "nil"'
+  return "\n".join(
+    [
+      f":local hook {quote(hook)}",
+      ":foreach i in=[/ip dhcp-server find] do={",
+      "  :local current [/ip dhcp-server get $i lease-script]",
+      "  :if ($current != $hook) do={",
+      f'    :if ($current = "" || {is_ours}) do={{',
+      "      /ip dhcp-server set $i lease-script=$hook",
+      "    } else={",
+      (
+        f'      :if ($hook != "") do={{ :put ({quote(LEASE_HOOK_SKIPPED_MARKER + " ")}'
+        " . [/ip dhcp-server get $i name]) }"
+      ),
+      "    }",
+      "  }",
+      "}",
+    ]
+  )
+
+
+def parse_skipped_lease_hooks(output: str) -> list[str]:
+  """returns the DHCP servers whose own lease-script kept the hook from being installed"""
+  return [
+    line.strip().removeprefix(LEASE_HOOK_SKIPPED_MARKER).strip()
+    for line in output.splitlines()
+    if line.strip().startswith(LEASE_HOOK_SKIPPED_MARKER)
+  ]
+
+
+def parse_installed(output: str) -> dict[str, str]:
+  """returns {script name: digest} for scripts whose script and scheduler entries agree"""
+  scripts: dict[str, str] = {}
+  schedulers: dict[str, str] = {}
+  for line in output.splitlines():
+    line = line.strip()
+    if not line.startswith(INSTALLED_MARKER):
+      continue
+    kind, name, comment = line.removeprefix(INSTALLED_MARKER).strip().split("|", 2)
+    if not (match := _TAG_PATTERN.search(comment)):
+      continue
+    if kind == "script":
+      scripts[name] = match.group(1)
+    elif kind == "scheduler":
+      schedulers[name.removesuffix("_schedule")] = match.group(1)
+  # a script without a matching scheduler entry (or vice versa) needs reinstalling
+  return {
+    name: digest if schedulers.get(name) == digest else "" for name, digest in scripts.items()
+  } | {name: "" for name in schedulers if name not in scripts}
+
+
+def parse_failures(output: str) -> list[str]:
+  """returns the script names reported as failed in the output of an imported bundle"""
+  failed = []
+  for line in output.splitlines():
+    if line.strip().startswith(FAILURE_MARKER):
+      failed.append(line.strip().removeprefix(FAILURE_MARKER).strip())
+  return failed
@@ -1,3 +1,4 @@
+from collections.abc import Iterator
 from dataclasses import dataclass, field
 
 from mhs.service.entity import Service, ServiceRef, ServiceRepo
@@ -42,24 +43,40 @@ class ServerRef:
 @dataclass
 class ServerRepo:
   _index: dict[ServerRef, Server] = field(default_factory=dict)
+  _hosts: dict[ServiceRef, Server] = field(default_factory=dict, repr=False)
+  """service -> first server hosting it"""
+  _frozen: bool = field(default=False, repr=False, compare=False)
+
+  def freeze(self):
+    """makes the repo read-only (e.g. once it is shared through the fleet cache)"""
+    self._frozen = True
 
   def __getitem__(self, ref: ServerRef) -> Server:
     if not isinstance(ref, ServerRef):
       ref = ServerRef(ref)
     return self._index[ref]
 
+  def __iter__(self) -> Iterator[Server]:
+    return iter(self._index.values())
+
   def __setitem__(self, ref: ServerRef, value: Server) -> None:
+    if self._frozen:
+      raise TypeError(f"{type(self).__name__} is read-only")
     if not isinstance(ref, ServerRef):
       ref = ServerRef(ref)
+    replaced = ref in self._index
     self._index[ref] = value
+    if replaced:
+      # the old server may have been the first host of services the new one doesn't run
+      self._hosts = {}
+      for server in self._index.values():
+        for service_ref in server.services._index:
+          self._hosts.setdefault(service_ref, server)
+      return
+    for service_ref in value.services._index:
+      self._hosts.setdefault(service_ref, value)
 
   def get_host(self, service_ref: Service | ServiceRef) -> Server | None:
     if not isinstance(service_ref, ServiceRef):
       service_ref = ServiceRef(service_ref)
-    for server in self._index.values():
-      try:
-        if server.services[service_ref]:
-          return server
-      except KeyError:
-        continue
-    return None
+    return self._hosts.get(service_ref)
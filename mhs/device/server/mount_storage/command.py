@@ -1,7 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from mhs.device.server.entity import Server
 from mhs.device.storage.entity import Storage
+from mhs.trace import traced
 
 
 @dataclass
@@ -9,7 +10,34 @@ class MountStorageCommand:
   storage: Storage
   server: Server
 
-  def execute(self):
+  @traced
+  def execute(self) -> dict[str, str]:
     from mhs.device.server.mount_storage.handler import handle
 
     return handle(self)
+
+  @traced
+  async def aexecute(self) -> dict[str, str]:
+    from mhs.device.server.mount_storage.handler import ahandle
+
+    return await ahandle(self)
+
+
+@dataclass
+class MountServerStorages:
+  """mounts every storage the server is missing, after probing what is already mounted."""
+
+  server: Server
+  storages: list[Storage] = field(default_factory=list)
+
+  @traced
+  def execute(self) -> dict[str, str]:
+    from mhs.device.server.mount_storage.handler import handle_server
+
+    return handle_server(self)
+
+  @traced
+  async def aexecute(self) -> dict[str, str]:
+    from mhs.device.server.mount_storage.handler import ahandle_server
+
+    return await ahandle_server(self)
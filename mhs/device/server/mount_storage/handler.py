@@ -1,11 +1,76 @@
-from mhs.device.server.mount_storage.command import MountStorageCommand
+from pathlib import Path
+
+from mhs import aio
+from mhs.device.server.mount_storage.command import MountServerStorages, MountStorageCommand
+from mhs.device.storage.entity import Storage
+from mhs.output import print_error, print_info, print_success
 from mhs.ssh.run_on.command import RunOn
 
+MEDIA_DIR = Path("my-home-server") / "media"  # relative to ssh home
+PROBE_COMMAND = "lsblk -rno UUID,MOUNTPOINT"
+
+
+def parse_probe(output: str) -> dict[str, str]:
+  """returns {UUID: mount point} for every attached filesystem; unmounted ones map to ''"""
+  mounts: dict[str, str] = {}
+  for line in output.splitlines():
+    uuid, _, mountpoint = line.partition(" ")
+    if uuid:
+      # lsblk -r escapes spaces in mount points as \x20
+      mounts[uuid.upper()] = mountpoint.strip().replace("\\x20", " ")
+  return mounts
+
+
+def plan_mounts(
+  storages: list[Storage],
+  mounts: dict[str, str],
+) -> tuple[list[Storage], dict[str, str]]:
+  """returns (storages to mount, error per storage that can't be mounted)"""
+  missing: list[Storage] = []
+  failures: dict[str, str] = {}
+  for storage in storages:
+    uuid = storage.uuid.upper()
+    if uuid not in mounts:
+      failures[storage.key] = f"UUID {storage.uuid} is not attached"
+    elif mounts[uuid]:
+      print_info(f"Storage '{storage.key}' is already mounted at {mounts[uuid]}")
+    else:
+      missing.append(storage)
+  return missing, failures
+
+
+def mount_command(storage: Storage) -> str:
+  target = (MEDIA_DIR / storage.key).as_posix()
+  return f"mkdir -p {target} && sudo -n mount UUID={storage.uuid} {target}"
+
 
-def handle(command: MountStorageCommand):
-  storage = command.storage
+def handle_server(command: MountServerStorages) -> dict[str, str]:
+  """returns an error message per storage that is not mounted"""
+  return aio.run(ahandle_server(command))
+
+
+async def ahandle_server(command: MountServerStorages) -> dict[str, str]:
+  """returns an error message per storage that is not mounted"""
   server = command.server
-  print(f"Mounting storage '{storage.key}' on device '{server.key}'")
-  raise NotImplementedError()
-  RunOn(ssh_host=server.ssh_host, command=f"mount {storage.key}").execute()
-  print(f"Successfully mounted storage '{storage.key}' on device '{server.key}'")
+  output, success = await RunOn(server.ssh_host, PROBE_COMMAND).aexecute()
+  if not success:
+    return {storage.key: f"Probe failed: {output}" for storage in command.storages}
+
+  missing, failures = plan_mounts(command.storages, parse_probe(output))
+  for storage in missing:
+    print_info(f"Mounting storage '{storage.key}' on device '{server.key}'")
+    output, success = await RunOn(server.ssh_host, mount_command(storage)).aexecute()
+    if success:
+      print_success(f"Mounted storage '{storage.key}' on device '{server.key}'")
+    else:
+      failures[storage.key] = output.strip()
+      print_error(f"Failed to mount storage '{storage.key}' on device '{server.key}': {output}")
+  return failures
+
+
+def handle(command: MountStorageCommand) -> dict[str, str]:
+  return handle_server(MountServerStorages(command.server, [command.storage]))
+
+
+async def ahandle(command: MountStorageCommand) -> dict[str, str]:
+  return await ahandle_server(MountServerStorages(command.server, [command.storage]))
@@ -19,6 +19,11 @@ class StorageRef:
 @dataclass
 class StorageRepo:
   _index: dict[StorageRef, Storage] = field(default_factory=dict)
+  _frozen: bool = field(default=False, repr=False, compare=False)
+
+  def freeze(self):
+    """makes the repo read-only (e.g. once it is shared through the fleet cache)"""
+    self._frozen = True
 
   def __getitem__(self, ref: StorageRef) -> Storage:
     if not isinstance(ref, StorageRef):
@@ -26,6 +31,8 @@ class StorageRepo:
     return self._index[ref]
 
   def __setitem__(self, ref: StorageRef, value: Storage) -> None:
+    if self._frozen:
+      raise TypeError(f"{type(self).__name__} is read-only")
     if not isinstance(ref, StorageRef):
       ref = StorageRef(ref)
     self._index[ref] = value
@@ -26,3 +26,8 @@ def print_warning(msg: str) -> None:
 def print_error(msg: str) -> None:
   """Print error message in red to stderr"""
   print(f"{RED}✗ {NC} {msg}", file=sys.stderr)
+
+
+def print_output(line: str) -> None:
+  """Print a line of remote command output as soon as it arrives"""
+  print(f"   {line}", flush=True)
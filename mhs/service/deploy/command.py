@@ -2,6 +2,7 @@ from dataclasses import dataclass, field
 
 from mhs.device.server.entity import ServerRef
 from mhs.service.entity import ServiceRef
+from mhs.trace import traced
 
 
 @dataclass
@@ -11,7 +12,20 @@ class DeployService:
   start_service: bool = True
   force_recreate: bool = False
 
+  def __post_init__(self):
+    if not isinstance(self.service, ServiceRef):
+      self.service = ServiceRef(self.service)
+
+    if self.host is not None and not isinstance(self.host, ServerRef):
+      self.host = ServerRef(self.host)
+
+  @traced
   def execute(self):
     from mhs.service.deploy.handler import handle
 
     handle(self)
+
+  async def aexecute(self):
+    from mhs.aio import to_thread
+
+    await to_thread(self.execute)
@@ -17,7 +17,7 @@ def determine_host(service: Service) -> Server:
 
 
 def _upload_service_files(service: Service, server: Server, remote_path: Path):
-  """Upload all service files to remote directory via rsync"""
+  """Sync all service files to the remote directory"""
   local_service_dir = Path(f"etc/{service.key}")
 
   if not local_service_dir.exists():
@@ -11,11 +11,30 @@ class Service:
   description: str = field(default="")
   mount_points: dict[str, Path] = field(default_factory=dict)
   """TODO: implement mount points"""
+  depends_on: list[str] = field(default_factory=list)
+  """keys of services that must be deployed before this one"""
+  proxy_timeout: int = field(default=86400)
+  """seconds ingress waits on a request to the service (long for uploads and streams)"""
+  cache_paths: list[str] = field(default_factory=list)
+  """nginx location matches (e.g. "~ ^/api/assets/[^/]+/thumbnail") ingress may cache"""
 
   def __str__(self) -> str:
     return self.key
 
 
+@dataclass(frozen=True)
+class Route:
+  """how ingress reaches a service from its public hostname"""
+
+  hostname: str
+  service_key: str
+  upstream_host: str
+  port: int
+
+  def __str__(self) -> str:
+    return f"{self.hostname} -> {self.upstream_host}:{self.port}"
+
+
 @dataclass
 class ServiceRef:
   key: Service | str
@@ -39,6 +58,11 @@ class ServiceRef:
 @dataclass
 class ServiceRepo:
   _index: dict[ServiceRef, Service] = field(default_factory=dict)
+  _frozen: bool = field(default=False, repr=False, compare=False)
+
+  def freeze(self):
+    """makes the repo read-only (e.g. once it is shared through the fleet cache)"""
+    self._frozen = True
 
   def __getitem__(self, ref: ServiceRef) -> Service:
     if not isinstance(ref, ServiceRef):
@@ -46,6 +70,8 @@ class ServiceRepo:
     return self._index[ref]
 
   def __setitem__(self, ref: ServiceRef, value: Service) -> None:
+    if self._frozen:
+      raise TypeError(f"{type(self).__name__} is read-only")
     if not isinstance(ref, ServiceRef):
       ref = ServiceRef(ref)
     self._index[ref] = value
@@ -0,0 +1,122 @@
+"""Shares one multiplexed SSH connection per host for the lifetime of the process."""
+
+import atexit
+import hashlib
+import shlex
+import shutil
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+
+from mhs import trace
+from mhs.config import SSH_CONTROL_PERSIST, SSH_MULTIPLEX
+
+_lock = threading.Lock()
+_host_locks: dict[str, threading.Lock] = {}
+_masters: dict[tuple[str, str], str | None] = {}
+"""(ssh_host, identity_file) -> control path of its running master, or None if it failed"""
+_control_dir: Path | None = None
+
+
+def _get_control_dir() -> Path:
+  global _control_dir
+  if _control_dir is None:
+    _control_dir = Path(tempfile.mkdtemp(prefix="mhs-ssh-"))
+    atexit.register(close_all)
+  return _control_dir
+
+
+def _control_path(ssh_host: str, identity_file: str) -> str:
+  # socket paths are limited to ~100 chars; a known path (unlike %C) lets us check it is alive
+  digest = hashlib.sha256(f"{ssh_host}\0{identity_file}".encode()).hexdigest()[:16]
+  return f"{_get_control_dir().as_posix()}/{digest}"
+
+
+def _start_master(ssh_host: str, identity_file: str, control_path: str) -> bool:
+  """opens a background master connection; returns True if it is usable"""
+  args = [
+    "ssh",
+    *(["-i", identity_file] if identity_file else []),
+    "-o",
+    "ControlMaster=yes",
+    "-o",
+    f"ControlPath={control_path}",
+    "-o",
+    f"ControlPersist={SSH_CONTROL_PERSIST}",
+    "-o",
+    "BatchMode=yes",
+    "-f",
+    "-N",
+    ssh_host,
+  ]
+  try:
+    # the master outlives this call, so it must not inherit our pipes
+    result = trace.run(
+      args,
+      stdin=subprocess.DEVNULL,
+      stdout=subprocess.DEVNULL,
+      stderr=subprocess.DEVNULL,
+      check=False,
+    )
+  except OSError:
+    return False
+  return result.returncode == 0
+
+
+def ssh_options(ssh_host: str, identity_file="") -> list[str]:
+  """returns ssh/scp options that route a connection through the shared master for the host.
+
+  The master is opened on first use, and again if it has exited since (e.g. after
+  ControlPersist or a dropped connection); if it cannot be opened (or multiplexing is
+  disabled), no options are returned and callers connect directly as before.
+  """
+  if not SSH_MULTIPLEX:
+    return []
+
+  key = (ssh_host, identity_file)
+  with _lock:
+    host_lock = _host_locks.setdefault(ssh_host, threading.Lock())
+
+  with host_lock:
+    if (control_path := _masters.get(key)) and not Path(control_path).exists():
+      del _masters[key]  # the master removes its socket when it exits
+    if key not in _masters:
+      control_path = _control_path(ssh_host, identity_file)
+      started = _start_master(ssh_host, identity_file, control_path)
+      _masters[key] = control_path if started else None
+    control_path = _masters[key]
+
+  if not control_path:
+    return []
+
+  return ["-o", "ControlMaster=no", "-o", f"ControlPath={control_path}"]
+
+
+def rsync_shell(ssh_host: str) -> list[str]:
+  """returns rsync args that make it use the shared master for the host"""
+  if options := ssh_options(ssh_host):
+    return ["-e", shlex.join(["ssh", *options])]
+  return []
+
+
+def close_all() -> None:
+  """tears down every master connection opened by this process"""
+  global _control_dir
+  with _lock:
+    masters = [(host, path) for (host, _), path in _masters.items() if path]
+    _masters.clear()
+    control_dir, _control_dir = _control_dir, None
+
+  if control_dir is None:
+    return
+
+  for ssh_host, control_path in masters:
+    subprocess.run(
+      ["ssh", "-o", f"ControlPath={control_path}", "-O", "exit", ssh_host],
+      stdin=subprocess.DEVNULL,
+      stdout=subprocess.DEVNULL,
+      stderr=subprocess.DEVNULL,
+      check=False,
+    )
+  shutil.rmtree(control_dir, ignore_errors=True)
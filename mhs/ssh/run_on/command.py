@@ -1,12 +1,23 @@
 from dataclasses import dataclass
 
+from mhs.trace import traced
+
 
 @dataclass
 class RunOn:
   ssh_host: str
   command: str
+  stream: bool = False
+  """print output live as it arrives, instead of returning all of it at the end"""
 
-  def execute(self):
+  @traced
+  def execute(self) -> tuple[str, bool]:
     from mhs.ssh.run_on.handler import handle
 
     return handle(self)
+
+  @traced
+  async def aexecute(self) -> tuple[str, bool]:
+    from mhs.ssh.run_on.handler import ahandle
+
+    return await ahandle(self)
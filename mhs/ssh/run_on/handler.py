@@ -1,8 +1,26 @@
+import asyncio
 import subprocess
+from collections import deque
+from collections.abc import Generator
 
-from mhs.output import print_error
+from mhs import trace
+from mhs.aio import host_limit, host_session
+from mhs.output import print_error, print_output
+from mhs.ssh.pool import ssh_options
 from mhs.ssh.run_on.command import RunOn
 
+STREAM_TAIL_LINES = 50
+"""lines of streamed output kept for the result (e.g. for error messages)"""
+
+
+def _ssh_args(host: str, command: str, user="", identity_file="") -> list[str]:
+  hostname = f"{user}@{host}" if user else host
+  args = ["ssh", *ssh_options(hostname, identity_file), hostname]
+  if identity_file:
+    args.extend(["-i", identity_file])
+  args.extend(["-x", command])
+  return args
+
 
 def _run_ssh_command(
   host: str,
@@ -11,25 +29,110 @@ def _run_ssh_command(
   identity_file="",
 ) -> tuple[str, bool]:
   """Returns (output, success)"""
-  hostname = f"{user}@{host}" if user else host
-  args = ["ssh", hostname]
-  if identity_file:
-    args.extend(["-i", identity_file])
-  args.extend(["-x", command])
+  args = _ssh_args(host, command, user, identity_file)
   try:
-    result = subprocess.run(
-      args,
-      capture_output=True,
-      text=True,
-      check=False,
-    )
+    with host_session(host):
+      result = trace.run(
+        args,
+        capture_output=True,
+        text=True,
+        check=False,
+      )
     if result.returncode:
       return result.stdout or result.stderr, False
     return result.stdout, True
-  except Exception as e:
+  except (OSError, subprocess.SubprocessError) as e:
     print_error(f"SSH command failed: {e}")
     return "Unhandled exception", False
 
 
+def iter_ssh_output(host: str, command: str) -> Generator[str, None, int]:
+  """Yields stdout/stderr lines as the remote command produces them; returns its exit status."""
+  args = _ssh_args(host, command)
+  with host_session(host), trace.process(args) as span:
+    process = subprocess.Popen(
+      args,
+      stdout=subprocess.PIPE,
+      stderr=subprocess.STDOUT,
+      text=True,
+      bufsize=1,
+    )
+    received = 0
+    try:
+      for line in process.stdout:
+        received += len(line)
+        yield line.rstrip("\n")
+    except GeneratorExit:
+      process.kill()  # the caller stopped reading
+      raise
+    finally:
+      process.stdout.close()
+      returncode = process.wait()
+      span.attrs.update(exit_code=returncode, bytes_in=received)
+  return returncode
+
+
+def _stream_ssh_command(host: str, command: str) -> tuple[str, bool]:
+  """Returns (last lines of output, success)"""
+  tail: deque[str] = deque(maxlen=STREAM_TAIL_LINES)
+  lines = iter_ssh_output(host, command)
+  try:
+    while True:
+      line = next(lines)
+      print_output(line)
+      tail.append(line)
+  except StopIteration as stop:
+    returncode = stop.value
+  except (OSError, subprocess.SubprocessError, UnicodeDecodeError) as e:
+    print_error(f"SSH command failed: {e}")
+    return "Unhandled exception", False
+  return "\n".join(tail), returncode == 0
+
+
+async def _arun_ssh_command(host: str, command: str, stream=False) -> tuple[str, bool]:
+  """Returns (output, success); with stream, output is the last lines only"""
+  # opening the shared master connection blocks, so keep it off the event loop
+  args = await asyncio.to_thread(_ssh_args, host, command)
+  async with host_limit(host):
+    with trace.process(args) as span:
+      process = None
+      try:
+        process = await asyncio.create_subprocess_exec(
+          *args,
+          stdout=asyncio.subprocess.PIPE,
+          stderr=asyncio.subprocess.STDOUT if stream else asyncio.subprocess.PIPE,
+        )
+        if not stream:
+          stdout, stderr = await process.communicate()
+          span.attrs.update(exit_code=process.returncode, bytes_in=len(stdout) + len(stderr))
+          if process.returncode:
+            return (stdout or stderr).decode(errors="replace"), False
+          return stdout.decode(errors="replace"), True
+
+        tail: deque[str] = deque(maxlen=STREAM_TAIL_LINES)
+        received = 0
+        async for raw_line in process.stdout:
+          received += len(raw_line)
+          line = raw_line.decode(errors="replace").rstrip("\n")
+          print_output(line)
+          tail.append(line)
+        span.attrs.update(exit_code=await process.wait(), bytes_in=received)
+        return "\n".join(tail), process.returncode == 0
+      except (OSError, ValueError) as e:  # ValueError: a line longer than the stream limit
+        print_error(f"SSH command failed: {e}")
+        return "Unhandled exception", False
+      finally:
+        # cancelled (e.g. a sibling failed) or failed mid-read: don't leave ssh running
+        if process is not None and process.returncode is None:
+          process.kill()
+          await process.wait()
+
+
+async def ahandle(command: RunOn):
+  return await _arun_ssh_command(command.ssh_host, command.command, command.stream)
+
+
 def handle(command: RunOn):
+  if command.stream:
+    return _stream_ssh_command(host=command.ssh_host, command=command.command)
   return _run_ssh_command(host=command.ssh_host, command=command.command)
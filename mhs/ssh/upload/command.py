@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 from pathlib import Path
 
+from mhs.trace import traced
+
 
 @dataclass
 class UploadDirectory:
@@ -9,17 +11,23 @@ class UploadDirectory:
   remote_dir: Path  # relative to ssh home
   # TODO exclude_patterns: list[str] = field(default_factory=list)
   host_is_windows: bool = False
-  clear: bool = False
+  clear: bool = False  # remove remote files that no longer exist locally
 
   def __post_init__(self):
     self.local_dir = Path(self.local_dir)
     self.remote_dir = Path(self.remote_dir)
 
+  @traced
   def execute(self):
     from mhs.ssh.upload.handler import handle_upload_directory
 
     return handle_upload_directory(self)
 
+  async def aexecute(self):
+    from mhs.aio import to_thread
+
+    return await to_thread(self.execute)
+
 
 @dataclass
 class UploadFile:
@@ -31,7 +39,14 @@ class UploadFile:
     self.local_file = Path(self.local_file)
     self.remote_file = Path(self.remote_file)
 
+  @traced
   def execute(self):
     from mhs.ssh.upload.handler import handle_upload_file
 
     return handle_upload_file(self)
+
+  @traced
+  async def aexecute(self):
+    from mhs.ssh.upload.handler import ahandle_upload_file
+
+    return await ahandle_upload_file(self)
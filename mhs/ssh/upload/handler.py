@@ -1,8 +1,12 @@
+import asyncio
 import os
 import subprocess
 from pathlib import Path
 
+from mhs import trace
+from mhs.aio import host_limit, host_session
 from mhs.config import LOCAL_ROOT
+from mhs.ssh.pool import rsync_shell, ssh_options
 from mhs.ssh.run_on.command import RunOn
 from mhs.ssh.upload.command import UploadDirectory, UploadFile
 
@@ -32,12 +36,37 @@ def _create_remote_directory(ssh_host: str, remote_path: Path, host_is_windows:
     raise RuntimeError(f"Failed to create remote directory: {output}")
 
 
-def handle_upload_directory(command: UploadDirectory):
-  if command.clear:
-    _delete_remote_directory(command.ssh_host, command.remote_dir)
+def _sync_directory(ssh_host: str, local_dir: Path, remote_dir: Path, delete: bool = False):
+  """transfers only changed files, in one rsync stream over the host's shared connection"""
+  rsync_cmd = [
+    "rsync",
+    "-az",
+    "--checksum",
+    *rsync_shell(ssh_host),
+    *(["--delete"] if delete else []),
+    f"{local_dir.as_posix()}/",
+    f"{ssh_host}:./{remote_dir.as_posix()}/",
+  ]
+
+  print("Syncing directory:", " ".join(rsync_cmd))
+  result = trace.run(rsync_cmd, capture_output=True, text=True, check=False)
+  if result.returncode != 0:
+    raise RuntimeError(f"Failed to sync directory: {result.stderr}")
 
-  _create_remote_directory(command.ssh_host, command.remote_dir, command.host_is_windows)
 
+def _copy_directory(ssh_host: str, local_dir: Path, remote_dir: Path):
+  """copies every file individually, for hosts without rsync"""
+  for dirname, dirnames, filenames in os.walk(local_dir):
+    for filename in filenames:
+      fp = Path(dirname) / filename
+      UploadFile(
+        ssh_host=ssh_host,
+        local_file=fp,
+        remote_file=remote_dir / fp.relative_to(local_dir),
+      ).execute()
+
+
+def handle_upload_directory(command: UploadDirectory):
   local_dir = command.local_dir
   if not local_dir.is_absolute():
     local_dir = LOCAL_ROOT / local_dir
@@ -47,35 +76,62 @@ def handle_upload_directory(command: UploadDirectory):
   if remote_dir.is_absolute():
     raise ValueError("Remote directory must be relative to SSH home")
 
-  for dirname, dirnames, filenames in os.walk(local_dir):
-    for filename in filenames:
-      fp = Path(dirname) / filename
-      UploadFile(
-        ssh_host=command.ssh_host,
-        local_file=fp,
-        remote_file=remote_dir / fp.relative_to(local_dir),
-      ).execute()
+  if command.host_is_windows:
+    if command.clear:
+      _delete_remote_directory(command.ssh_host, remote_dir)
+    _create_remote_directory(command.ssh_host, remote_dir, host_is_windows=True)
+    _copy_directory(command.ssh_host, local_dir, remote_dir)
+    return
 
+  # clearing is done by rsync deleting remote files that no longer exist locally
+  _create_remote_directory(command.ssh_host, remote_dir)
+  _sync_directory(command.ssh_host, local_dir, remote_dir, delete=command.clear)
 
-def handle_upload_file(command: UploadFile):
+
+def _scp_args(command: UploadFile) -> list[str]:
   if not command.local_file.is_absolute():
     raise ValueError("Local file path must be absolute")
 
   if command.remote_file.is_absolute():
     raise ValueError("Remote file path must be relative to SSH home")
 
-  scp_cmd = [
+  return [
     "scp",
+    *ssh_options(command.ssh_host),
     command.local_file.as_posix(),
     f"{command.ssh_host}:./{command.remote_file.as_posix()}",
   ]
 
+
+def handle_upload_file(command: UploadFile):
+  scp_cmd = _scp_args(command)
+
   print("Uploading file:", " ".join(scp_cmd))
-  result = subprocess.run(scp_cmd, capture_output=True, text=True)
+  with host_session(command.ssh_host), trace.process(scp_cmd) as span:
+    result = subprocess.run(scp_cmd, capture_output=True, text=True, check=False)
+    span.attrs.update(exit_code=result.returncode, bytes_out=command.local_file.stat().st_size)
   if result.returncode != 0:
     raise RuntimeError(f"Failed to upload file: {result.stderr}")
 
 
+async def ahandle_upload_file(command: UploadFile):
+  # opening the shared master connection blocks, so keep it off the event loop
+  scp_cmd = await asyncio.to_thread(_scp_args, command)
+
+  print("Uploading file:", " ".join(scp_cmd))
+  async with host_limit(command.ssh_host):
+    with trace.process(scp_cmd) as span:
+      process = await asyncio.create_subprocess_exec(
+        *scp_cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+      )
+      _, stderr = await process.communicate()
+      span.attrs.update(exit_code=process.returncode, bytes_out=command.local_file.stat().st_size)
+  if process.returncode != 0:
+    raise RuntimeError(f"Failed to upload file: {stderr.decode(errors='replace')}")
+
+
 def handle(command: UploadDirectory | UploadFile):
   if isinstance(command, UploadDirectory):
     handle_upload_directory(command)
@@ -0,0 +1,194 @@
+"""Opt-in timing of command/query executions and the processes they spawn.
+
+Set MHS_TRACE=1 to print a span tree to stderr when the process exits, or MHS_TRACE=<file> to
+write it there instead (a `.json` file gets Chrome trace format, for chrome://tracing or
+Perfetto). Spans nest through contextvars, so asyncio tasks and `aio.to_thread` calls land under
+the span that started them; work handed to a plain thread pool shows up as a separate root.
+"""
+
+import atexit
+import functools
+import inspect
+import json
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TypeVar
+
+from mhs.config import TRACE
+
+F = TypeVar("F", bound=Callable)
+
+MAX_COMMAND_LENGTH = 200
+"""span attributes describing a command line or command are truncated to this"""
+
+
+@dataclass
+class Span:
+  name: str
+  attrs: dict[str, object] = field(default_factory=dict)
+  start: float = field(default_factory=time.perf_counter)
+  end: float = 0.0
+  thread: str = field(default_factory=lambda: threading.current_thread().name)
+  children: list["Span"] = field(default_factory=list)
+
+  @property
+  def duration_ms(self) -> float:
+    return ((self.end or time.perf_counter()) - self.start) * 1000
+
+
+_roots: list[Span] = []
+_roots_lock = threading.Lock()
+_current: ContextVar[Span | None] = ContextVar("mhs_trace_span", default=None)
+_origin = time.perf_counter()
+
+
+def enabled() -> bool:
+  return bool(TRACE)
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Span]:
+  """times the block as a child of the current span; set more attrs on the yielded span"""
+  current = Span(name, attrs)
+  if not enabled():
+    yield current
+    return
+
+  parent = _current.get()
+  if parent is None:
+    with _roots_lock:
+      _roots.append(current)
+  else:
+    parent.children.append(current)
+  token = _current.set(current)
+  try:
+    yield current
+  except BaseException as e:
+    current.attrs["error"] = type(e).__name__
+    raise
+  finally:
+    current.end = time.perf_counter()
+    try:
+      _current.reset(token)
+    except ValueError:
+      _current.set(parent)  # a generator finished from another context
+
+
+def _target(instance) -> str:
+  return str(instance)[:MAX_COMMAND_LENGTH]
+
+
+def traced(method: F) -> F:
+  """records each call of a command/query method (e.g. execute) as a span"""
+  if inspect.iscoroutinefunction(method):
+
+    @functools.wraps(method)
+    async def async_wrapper(self, *args, **kwargs):
+      if not enabled():
+        return await method(self, *args, **kwargs)
+      with span(f"{type(self).__name__}.{method.__name__}", target=_target(self)):
+        return await method(self, *args, **kwargs)
+
+    return async_wrapper
+
+  @functools.wraps(method)
+  def wrapper(self, *args, **kwargs):
+    if not enabled():
+      return method(self, *args, **kwargs)  # skips building the target (a dataclass repr)
+    with span(f"{type(self).__name__}.{method.__name__}", target=_target(self)):
+      return method(self, *args, **kwargs)
+
+  return wrapper
+
+
+@contextmanager
+def process(args: list[str]) -> Iterator[Span]:
+  """times a spawned process; set exit_code (and bytes, if known) on the yielded span"""
+  if not enabled():
+    yield Span("process")
+    return
+  command = shlex.join(str(arg) for arg in args)
+  with span(Path(str(args[0])).name, command=command[:MAX_COMMAND_LENGTH]) as current:
+    yield current
+
+
+def run(args: list[str], *, check: bool, **kwargs) -> subprocess.CompletedProcess:
+  """subprocess.run, recorded with its exit code and captured output size"""
+  with process(args) as current:
+    result = subprocess.run(args, check=check, **kwargs)
+    current.attrs["exit_code"] = result.returncode
+    captured = [output for output in (result.stdout, result.stderr) if output]
+    if captured:
+      current.attrs["bytes_in"] = sum(
+        len(output.encode() if isinstance(output, str) else output) for output in captured
+      )
+  return result
+
+
+def format_tree(spans: list[Span], depth=0) -> list[str]:
+  lines = []
+  for current in sorted(spans, key=lambda span: span.start):
+    attrs = " ".join(f"{key}={value}" for key, value in current.attrs.items() if key != "command")
+    label = current.attrs.get("command", current.name)
+    lines.append(f"{current.duration_ms:10.1f}ms  {'  ' * depth}{label}  {attrs}".rstrip())
+    lines.extend(format_tree(current.children, depth + 1))
+  return lines
+
+
+def to_chrome_trace(spans: list[Span]) -> dict:
+  """complete ("X") events, one track per thread"""
+  events = []
+  threads: dict[str, int] = {}
+  pending = list(spans)
+  while pending:
+    current = pending.pop()
+    if current.thread not in threads:
+      threads[current.thread] = len(threads) + 1
+      events.append(
+        {
+          "name": "thread_name",
+          "ph": "M",
+          "pid": os.getpid(),
+          "tid": threads[current.thread],
+          "args": {"name": current.thread},
+        }
+      )
+    events.append(
+      {
+        "name": current.name,
+        "ph": "X",
+        "ts": (current.start - _origin) * 1e6,
+        "dur": current.duration_ms * 1000,
+        "pid": os.getpid(),
+        "tid": threads[current.thread],
+        "args": {key: str(value) for key, value in current.attrs.items()},
+      }
+    )
+    pending.extend(current.children)
+  return {"traceEvents": sorted(events, key=lambda event: event.get("ts", 0))}
+
+
+def dump(destination: str = TRACE):
+  with _roots_lock:
+    spans = list(_roots)
+  if not spans:
+    return
+  if destination == "1":
+    print("\n".join(["Trace:", *format_tree(spans)]), file=sys.stderr)
+  elif destination.endswith(".json"):
+    Path(destination).write_text(json.dumps(to_chrome_trace(spans)))
+  else:
+    Path(destination).write_text("\n".join(format_tree(spans)) + "\n")
+
+
+if enabled():
+  atexit.register(dump)
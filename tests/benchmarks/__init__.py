@@ -0,0 +1 @@
+"""Benchmarks for fleet operations against a local SSH stand-in; see `python -m tests.benchmarks -h`."""
@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from tests.benchmarks.harness import StandIn
+
+NOISE_FLOOR_MS = 5.0
+"""slowdowns smaller than this are never reported, however large relative to the baseline"""
+
+
+def compare(results: list[dict], baseline: dict, tolerance: float) -> list[str]:
+  """returns a message per benchmark whose median regressed past the tolerance"""
+  previous = {(result["name"], result["size"]): result for result in baseline["results"]}
+  regressions = []
+  for result in results:
+    if not (before := previous.get((result["name"], result["size"]))):
+      continue
+    allowed = max(before["median_ms"] * (1 + tolerance), before["median_ms"] + NOISE_FLOOR_MS)
+    if result["median_ms"] > allowed:
+      regressions.append(
+        f"{result['name']} ({result['size']}): {before['median_ms']:.1f}ms"
+        f" -> {result['median_ms']:.1f}ms"
+      )
+  return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(
+    prog="python -m tests.benchmarks",
+    description="Times fleet operations against a local SSH stand-in and RouterOS stub.",
+  )
+  parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+  parser.add_argument("--repeat", type=int, default=5, help="samples per benchmark")
+  parser.add_argument("--seed", type=int, default=0, help="seed for synthetic fleets and files")
+  parser.add_argument("--output", type=Path, help="write results as JSON")
+  parser.add_argument("--baseline", type=Path, help="fail on regressions against these results")
+  parser.add_argument(
+    "--tolerance", type=float, default=0.25, help="allowed slowdown vs the baseline (0.25 = 25%%)"
+  )
+  args = parser.parse_args(argv)
+
+  root = Path(tempfile.mkdtemp(prefix="mhs-bench-"))
+  try:
+    standin = StandIn(root)
+    os.environ.update(standin.install())
+    from tests.benchmarks.suite import run_suite
+
+    results = []
+    for size in args.sizes:
+      for result in run_suite(standin, size, args.repeat, args.seed):
+        print(f"{result.name:<30} {size:>6} {result.median_ms:>10.1f}ms", flush=True)
+        results.append(result.to_dict())
+  finally:
+    shutil.rmtree(root, ignore_errors=True)
+
+  report = {
+    "python": platform.python_version(),
+    "platform": platform.platform(),
+    "repeat": args.repeat,
+    "seed": args.seed,
+    "results": results,
+  }
+  if args.output:
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+  if args.baseline and (
+    regressions := compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+  ):
+    print("Regressions:", *regressions, sep="\n  ", file=sys.stderr)
+    return 1
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,147 @@
+"""Builds the stand-in environment the benchmarks run in, and times them."""
+
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# mhs reads MHS_LOCAL_ROOT on import, so it must not be imported before the stand-in exists
+REPO_ROOT = Path(__file__).resolve().parents[2]
+STANDIN = Path(__file__).with_name("standin.py")
+INGRESS_IP = "192.168.88.2"
+DOMAIN = "bench.example"
+
+
+def make_fleet(devices: int, seed: int = 0) -> dict:
+  """a fleet.json with one service per device; every other service is public"""
+  rng = random.Random(seed)
+
+  def mac() -> str:
+    return ":".join(f"{rng.randrange(256):02X}" for _ in range(6))
+
+  fleet = {"domains": {"bench": {"domain": DOMAIN}}, "media": {}, "devices": {}}
+  for i in range(devices):
+    service = {"port": 10000 + i}
+    if i % 2 == 0:
+      service |= {"subdomain": f"svc{i}", "domain_key": "bench"}
+    fleet["devices"][f"device-{i:04d}"] = {
+      "macs": [mac(), mac()],
+      "description": f"Bench device {i}",
+      "services": {f"svc-{i:04d}": service},
+    }
+  return fleet
+
+
+def make_files(root: Path, count: int, size: int = 4096, seed: int = 0) -> list[str]:
+  """writes `count` files under etc/bench; returns their paths relative to root"""
+  rng = random.Random(seed)
+  files = []
+  for i in range(count):
+    file_rel = f"etc/bench/{i % 10}/file-{i:04d}.txt"
+    path = root / file_rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(rng.randbytes(size))
+    files.append(file_rel)
+  return files
+
+
+@dataclass
+class StandIn:
+  """a local root for mhs, fake ssh/scp on PATH, and per-host homes plus a router stub"""
+
+  root: Path
+  local_root: Path = field(init=False)
+
+  def __post_init__(self):
+    self.local_root = self.root / "mhs-root"
+
+  def install(self) -> dict[str, str]:
+    """creates the stand-in; returns the environment mhs must be imported under"""
+    bin_dir = self.root / "bin"
+    bin_dir.mkdir(parents=True)
+    for program in ["ssh", "scp"]:
+      shim = bin_dir / program
+      shim.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{STANDIN}" {program} "$@"\n')
+      shim.chmod(0o755)
+
+    self.local_root.mkdir()
+    env_file = (REPO_ROOT / "example.env").read_text()
+    (self.local_root / "example.env").write_text(env_file)
+    (self.local_root / ".env").write_text(env_file)
+    self.reset_router()
+
+    return {
+      "PATH": f"{bin_dir}{os.pathsep}{os.environ['PATH']}",
+      "MHS_LOCAL_ROOT": str(self.local_root),
+      "MHS_STANDIN_ROOT": str(self.root),
+      "MHS_SSH_MULTIPLEX": "0",
+    }
+
+  @property
+  def fleet_file(self) -> Path:
+    return self.local_root / "fleet.json"
+
+  def write_fleet(self, devices: int, seed: int = 0):
+    self.fleet_file.write_text(json.dumps(make_fleet(devices, seed), indent=2))
+
+  def reset_router(self):
+    """a router with only the ingress entry, as after a factory reset plus manual setup"""
+    state = {"scripts": {}, "schedulers": {}, "dns": {"ingress.lan": INGRESS_IP}}
+    (self.root / "router" / "files").mkdir(parents=True, exist_ok=True)
+    (self.root / "router" / "state.json").write_text(json.dumps(state))
+
+  def router_state(self) -> dict:
+    return json.loads((self.root / "router" / "state.json").read_text())
+
+  def host_home(self, ssh_host: str) -> Path:
+    return self.root / "homes" / ssh_host
+
+
+@dataclass
+class Result:
+  name: str
+  size: int
+  samples_ms: list[float]
+
+  @property
+  def median_ms(self) -> float:
+    return statistics.median(self.samples_ms)
+
+  def to_dict(self) -> dict:
+    return {
+      "name": self.name,
+      "size": self.size,
+      "median_ms": round(self.median_ms, 2),
+      "min_ms": round(min(self.samples_ms), 2),
+      "max_ms": round(max(self.samples_ms), 2),
+      "samples_ms": [round(sample, 2) for sample in self.samples_ms],
+    }
+
+
+def measure(
+  name: str,
+  size: int,
+  func: Callable[[], object],
+  repeat: int,
+  setup: Callable[[], None] | None = None,
+) -> Result:
+  """times `func` (after `setup`, untimed) `repeat` times; fails if it returns a falsy value"""
+  samples = []
+  for _ in range(repeat):
+    if setup:
+      setup()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+      started = time.perf_counter()
+      ok = func()
+      samples.append((time.perf_counter() - started) * 1000)
+    if not ok:
+      raise RuntimeError(f"{name} ({size}) failed:\n{output.getvalue()}")
+  return Result(name, size, samples)
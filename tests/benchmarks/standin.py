@@ -0,0 +1,125 @@
+"""Local stand-in for `ssh` and `scp`, plus a minimal RouterOS stub for the `router` host.
+
+Installed on PATH by the harness as `ssh` and `scp` wrappers that run this file. Each ssh host
+gets its own home directory under $MHS_STANDIN_ROOT/homes; commands for the router are answered
+from a JSON state file instead of a shell. The stub only understands what mhs sends it.
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(os.environ["MHS_STANDIN_ROOT"])
+ROUTER = "router"
+ROUTER_FILES = ROOT / "router" / "files"
+ROUTER_STATE = ROOT / "router" / "state.json"
+
+_FLAGS_WITH_VALUE = {"-o", "-i", "-e", "-p", "-P", "-F", "-O", "-l"}
+_STRING = r'"((?:\\.|[^"\\])*)"'
+_ESCAPE = re.compile(r"\\(\n\s*|.)")
+
+
+def unquote(value: str) -> str:
+  # continuation lines ("\" + newline + indent) vanish; other escapes keep their character
+  return _ESCAPE.sub(lambda m: "" if m.group(1).startswith("\n") else m.group(1), value)
+
+
+def split_args(args: list[str]) -> list[str]:
+  """drops option flags (and their values), leaving the positional arguments"""
+  positional = []
+  it = iter(args)
+  for arg in it:
+    if arg in _FLAGS_WITH_VALUE:
+      next(it, None)
+    elif not arg.startswith("-") or positional:
+      positional.append(arg)
+  return positional
+
+
+def host_home(host: str) -> Path:
+  home = ROOT / "homes" / host
+  home.mkdir(parents=True, exist_ok=True)
+  return home
+
+
+def load_state() -> dict:
+  try:
+    return json.loads(ROUTER_STATE.read_text())
+  except FileNotFoundError:
+    return {"scripts": {}, "schedulers": {}, "dns": {}}
+
+
+def apply(state: dict, commands: str) -> None:
+  """applies what mhs renders for the router: script bundles and DNS changes"""
+  for block in re.split(r"^:do \{", commands, flags=re.MULTILINE)[1:]:
+    script = re.search(rf"/system script find name={_STRING}", block)
+    scheduler = re.search(rf"/system scheduler find name={_STRING}", block)
+    comment = re.search(rf"comment={_STRING}", block)
+    if script and scheduler and comment:
+      state["scripts"][unquote(script.group(1))] = unquote(comment.group(1))
+      state["schedulers"][unquote(scheduler.group(1))] = unquote(comment.group(1))
+
+  for menu, kind in [("/system script", "scripts"), ("/system scheduler", "schedulers")]:
+    for name in re.findall(rf"{menu} remove \[find name={_STRING}\]", commands):
+      state[kind].pop(unquote(name), None)
+
+  for name in re.findall(rf"/ip dns static remove \[find name={_STRING}\]", commands):
+    state["dns"].pop(unquote(name), None)
+  for name, address in re.findall(
+    rf"/ip dns static set \[find name={_STRING}\] address={_STRING}", commands
+  ):
+    state["dns"][unquote(name)] = unquote(address)
+  for name, address in re.findall(
+    rf"/ip dns static add name={_STRING} address={_STRING}", commands
+  ):
+    state["dns"][unquote(name)] = unquote(address)
+
+
+def router(command: str) -> int:
+  state = load_state()
+  output = []
+  if "[MHS] installed:" in command:
+    for kind, menu in [("script", "scripts"), ("scheduler", "schedulers")]:
+      output += [f"[MHS] installed: {kind}|{name}|{c}" for name, c in state[menu].items()]
+  elif "/ip dns static find where name" in command:
+    output += [f"[MHS] dns:{name}|{address}" for name, address in state["dns"].items()]
+  elif match := re.match(r"/import (\S+);", command):
+    bundle = ROUTER_FILES / match.group(1).strip("'\"")
+    apply(state, bundle.read_text())
+    bundle.unlink()
+  else:
+    apply(state, command)
+  ROUTER_STATE.write_text(json.dumps(state))
+  print("\n".join(output))
+  return 0
+
+
+def ssh(args: list[str]) -> int:
+  host, *command = split_args(args)
+  command = [arg for arg in command if arg not in ("-x", "-t")]
+  if host == ROUTER:
+    return router(" ".join(command))
+  return subprocess.run(
+    ["bash", "-c", " ".join(command)], cwd=host_home(host), check=False
+  ).returncode
+
+
+def scp(args: list[str]) -> int:
+  source, destination = split_args(args)
+  host, _, path = destination.partition(":")
+  if host == ROUTER:
+    target = ROUTER_FILES / path.lstrip("/")
+  else:
+    target = host_home(host) / path
+  target.parent.mkdir(parents=True, exist_ok=True)
+  shutil.copyfile(source, target)
+  return 0
+
+
+if __name__ == "__main__":
+  program, *arguments = sys.argv[1:]
+  sys.exit({"ssh": ssh, "scp": scp}[program](arguments))
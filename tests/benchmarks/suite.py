@@ -0,0 +1,96 @@
+"""The benchmarks themselves. Import only after the stand-in environment is in place."""
+
+import shutil
+from pathlib import Path
+
+from mhs.control.execute_service_script.handler import bidirectional_sync
+from mhs.control.sync_split_dns.command import SyncSplitDns
+from mhs.data.fleet.load.handler import parse_fleet
+from mhs.data.fleet.load.query import LoadFleet
+from mhs.device.discover.command import DiscoverDeviceBatch, DiscoverFleet
+from mhs.ssh.upload.command import UploadDirectory
+from tests.benchmarks.harness import DOMAIN, Result, StandIn, make_files, measure
+
+SYNC_HOST = "device-0000"
+
+
+def run_suite(standin: StandIn, size: int, repeat: int, seed: int = 0) -> list[Result]:
+  """runs every benchmark against a fleet of `size` devices (and `size` files to transfer)"""
+  standin.write_fleet(size, seed)
+  fleet = LoadFleet(standin.fleet_file).execute()
+  keys = [server.key for server in fleet.servers]
+  results = []
+
+  def load_fleet():
+    return parse_fleet(standin.fleet_file, "devices", "media")
+
+  results.append(measure("load_fleet", size, load_fleet, repeat))
+  results.append(
+    measure("load_fleet (cached)", size, LoadFleet(standin.fleet_file).execute, repeat)
+  )
+
+  def discover():
+    return not DiscoverDeviceBatch(keys).execute()
+
+  results.append(measure("discover", size, discover, repeat, setup=standin.reset_router))
+  results.append(measure("discover (unchanged)", size, discover, repeat))
+
+  def discover_fleet():
+    return not DiscoverFleet().execute()
+
+  results.append(
+    measure("discover_fleet", size, discover_fleet, repeat, setup=standin.reset_router)
+  )
+  results.append(measure("discover_fleet (unchanged)", size, discover_fleet, repeat))
+
+  sync_split_dns = SyncSplitDns(
+    hostnames=sorted(set(fleet.get_public_hostnames())),
+    domains=[DOMAIN],
+  ).execute
+  results.append(measure("split_dns", size, sync_split_dns, repeat, setup=standin.reset_router))
+  results.append(measure("split_dns (unchanged)", size, sync_split_dns, repeat))
+
+  files = make_files(standin.local_root, size, seed=seed)
+  server = fleet.servers[SYNC_HOST]
+  manifest_file = standin.local_root / ".temp" / "bench-manifest.json"
+
+  def clear_remote():
+    shutil.rmtree(standin.host_home(SYNC_HOST), ignore_errors=True)
+    manifest_file.unlink(missing_ok=True)
+
+  def push(scp_only: bool):
+    return lambda: bidirectional_sync(
+      server,
+      from_remote_files=[],
+      to_remote_files=files,
+      service_key="bench",
+      root_dir=standin.local_root,
+      scp_only=scp_only,
+      manifest_file=manifest_file,
+    )
+
+  def pull():
+    return bidirectional_sync(
+      server,
+      from_remote_files=files,
+      to_remote_files=[],
+      service_key="bench",
+      root_dir=standin.local_root,
+      scp_only=True,
+    )
+
+  results.append(measure("sync push (tar)", size, push(True), repeat, setup=clear_remote))
+  results.append(measure("sync push (unchanged)", size, push(True), repeat))
+  results.append(measure("sync pull (tar)", size, pull, repeat))
+
+  if shutil.which("rsync"):
+    results.append(measure("sync push (rsync)", size, push(False), repeat, setup=clear_remote))
+
+    def upload():
+      UploadDirectory(SYNC_HOST, Path("etc") / "bench", Path("uploaded"), clear=True).execute()
+      return True
+
+    results.append(measure("upload_directory", size, upload, repeat, setup=clear_remote))
+    results.append(measure("upload_directory (unchanged)", size, upload, repeat))
+
+  return results
@@ -0,0 +1,100 @@
+"""The agent runs actions concurrently for thin clients, relaying output and exit codes."""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from mhs import LOCAL_ROOT
+from mhs.agent.args import build_parser
+from mhs.control.deploy_services.command import DeployServices
+
+ACTION = """
+import asyncio
+import functools
+from dataclasses import dataclass, field
+
+from mhs import aio
+from mhs.output import print_info
+
+
+@dataclass
+class Echo:
+  words: list[str] = field(default_factory=list)
+  delay: float = 0.0
+
+  def execute(self):
+    # concurrent jobs each drive an event loop, and print from helper threads
+    async def echo():
+      await asyncio.sleep(self.delay)
+      await aio.gather([aio.to_thread(functools.partial(print_info, w)) for w in self.words])
+
+    aio.run(echo())
+    if "fail" in self.words:
+      raise RuntimeError("asked to fail")
+    if "crash" in self.words:
+      raise ZeroDivisionError("asked to crash")
+"""
+
+
+def test_parser():
+  parser = build_parser(DeployServices, "deploy")
+  assert vars(parser.parse_args(["immich", "kopia", "--jobs", "2", "--no-start-service"])) == {
+    "services": ["immich", "kopia"],
+    "jobs": 2,
+    "start_service": False,
+    "force_recreate": False,
+  }
+
+
+def test(sandbox):
+  sandbox.write("probe/__init__.py", "")
+  sandbox.write("probe/command.py", ACTION)
+  socket_path = sandbox.root / "agent.sock"
+  env = os.environ | {"PYTHONPATH": os.pathsep.join([str(LOCAL_ROOT), str(sandbox.root)])}
+  agent = [sys.executable, "-m", "mhs.agent", "--socket", str(socket_path)]
+
+  # a socket left behind by an agent that died doesn't count as running, and is replaced
+  with socket.socket(socket.AF_UNIX) as stale:
+    stale.bind(str(socket_path))
+  assert socket_path.is_socket()
+  assert subprocess.run([*agent, "ping"], env=env, check=False).returncode == 1
+
+  server = subprocess.Popen([*agent, "serve", "--jobs", "3"], env=env, stdout=subprocess.DEVNULL)
+  try:
+    for _ in range(50):
+      if subprocess.run([*agent, "ping"], env=env, check=False).returncode == 0:
+        break
+      time.sleep(0.1)
+
+    def call(*args: str, **kwargs):
+      command = [*agent, "call", "probe", "--", *args]
+      return subprocess.Popen(command, env=env, stdout=subprocess.PIPE, text=True, **kwargs)
+
+    result = call("hello", "world")
+    stdout = result.communicate()[0]
+    assert "hello" in stdout and "world" in stdout
+    assert result.returncode == 0
+
+    result = call("fail", stderr=subprocess.PIPE)
+    stdout, stderr = result.communicate()
+    assert "fail" in stdout and "asked to fail" in stderr
+    assert result.returncode == 1
+
+    # an unexpected error is reported, and its worker replaced (the jobs below need them all)
+    result = call("crash", stderr=subprocess.PIPE)
+    stdout, stderr = result.communicate()
+    assert "Unexpected ZeroDivisionError: asked to crash" in stderr
+    assert result.returncode == 1
+
+    started = time.monotonic()
+    calls = [call(f"job{i}", f"job{i}", "--delay", "0.5") for i in range(3)]
+    outputs = [process.communicate()[0] for process in calls]
+    assert [output.count(f"job{i}") for i, output in enumerate(outputs)] == [2, 2, 2]
+    assert all(process.returncode == 0 for process in calls)
+    assert time.monotonic() - started < 1.4, "jobs should run concurrently"
+  finally:
+    server.terminate()
+    server.wait(timeout=5)
+  assert not socket_path.exists()
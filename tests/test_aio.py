@@ -0,0 +1,82 @@
+"""The async core caps overall and per-host concurrency, and keeps results in order."""
+
+import asyncio
+import gc
+import threading
+import time
+
+from mhs import aio
+from mhs.config import SSH_MAX_SESSIONS
+
+
+def test():
+  active = 0
+  peak = 0
+
+  async def work(value: int, delay: float) -> int:
+    nonlocal active, peak
+    active += 1
+    peak = max(peak, active)
+    await asyncio.sleep(delay)
+    active -= 1
+    if value < 0:
+      raise ValueError(value)
+    return value
+
+  results = aio.run(aio.gather([work(i, 0.01 * (5 - i)) for i in range(5)], limit=2))
+  assert results == [0, 1, 2, 3, 4]
+  assert peak == 2
+
+  peak = 0
+  results = aio.run(aio.gather([work(1, 0.01), work(-1, 0)], return_exceptions=True))
+  assert results[0] == 1 and isinstance(results[1], ValueError)
+  assert peak == 2
+
+  async def on_host(host: str):
+    async with aio.host_limit(host):
+      return await work(0, 0.01)
+
+  peak = 0
+  aio.run(aio.gather([on_host("nas") for _ in range(SSH_MAX_SESSIONS + 3)]))
+  assert peak == SSH_MAX_SESSIONS
+
+  # the cap is per process: threads with their own loops (e.g. agent workers) and blocking
+  # callers share it
+  lock = threading.Lock()
+  sessions = 0
+  session_peak = 0
+
+  def session():
+    nonlocal sessions, session_peak
+    with lock:
+      sessions += 1
+      session_peak = max(session_peak, sessions)
+    time.sleep(0.01)
+    with lock:
+      sessions -= 1
+
+  async def async_session():
+    async with aio.host_limit("pi"):
+      await asyncio.to_thread(session)
+
+  def blocking_session():
+    with aio.host_session("pi"):
+      session()
+
+  loops = []
+
+  def worker():
+    aio.run(aio.gather([async_session() for _ in range(SSH_MAX_SESSIONS)]))
+    loops.append(aio._local.owner.loop)
+
+  threads = [threading.Thread(target=worker) for _ in range(2)]
+  threads += [threading.Thread(target=blocking_session) for _ in range(SSH_MAX_SESSIONS)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  assert session_peak == SSH_MAX_SESSIONS
+
+  # a worker thread's loop is closed once the thread finishes
+  gc.collect()
+  assert len(loops) == 2 and all(loop.is_closed() for loop in loops)
@@ -0,0 +1,36 @@
+"""The benchmark harness runs end to end against its SSH stand-in and catches regressions."""
+
+import json
+import subprocess
+import sys
+
+from mhs import LOCAL_ROOT
+
+
+def test(tmp_path):
+  output = tmp_path / "bench.json"
+  args = [sys.executable, "-m", "tests.benchmarks", "--sizes", "10", "--repeat", "1"]
+  result = subprocess.run(
+    [*args, "--output", output], cwd=LOCAL_ROOT, capture_output=True, text=True, check=False
+  )
+  assert result.returncode == 0, result.stderr
+
+  report = json.loads(output.read_text())
+  names = {entry["name"] for entry in report["results"]}
+  assert {
+    "load_fleet",
+    "discover",
+    "discover (unchanged)",
+    "split_dns",
+    "sync push (tar)",
+  } <= names
+
+  for entry in report["results"]:
+    entry["median_ms"] = 0.0
+  baseline = tmp_path / "baseline.json"
+  baseline.write_text(json.dumps(report))
+  result = subprocess.run(
+    [*args, "--baseline", baseline], cwd=LOCAL_ROOT, capture_output=True, text=True, check=False
+  )
+  assert result.returncode == 1
+  assert "discover (10)" in result.stderr
@@ -0,0 +1,39 @@
+"""Settings are read lazily, once, with environment overrides; importing handlers needs no .env."""
+
+import subprocess
+import sys
+
+import pytest
+
+from mhs import config
+
+
+def test(sandbox, monkeypatch):
+  monkeypatch.setattr(config, "ENV_FILE", sandbox.root / ".env")
+  monkeypatch.setattr(config, "EXAMPLE_ENV_FILE", sandbox.write("example.env", "A=1\nB=2\n"))
+  monkeypatch.setenv("B", "3")
+  config.get_env.cache_clear()
+  try:
+    with pytest.raises(RuntimeError, match="Created default .env"):
+      config.get_setting("A")
+    assert sandbox.read(".env") == "A=1\nB=2\n"
+
+    assert config.get_setting("A") == "1"
+    assert config.get_setting("B") == "3"
+    sandbox.write(".env", "A=changed\n")
+    assert config.get_setting("A") == "1", "settings are read once per process"
+    with pytest.raises(RuntimeError, match="C is not set"):
+      config.get_setting("C")
+  finally:
+    config.get_env.cache_clear()
+
+  # a root without any .env: importing must neither create one nor exit
+  imports = "import mhs.device.discover.handler, mhs.control.sync_split_dns.handler"
+  result = subprocess.run(
+    [sys.executable, "-c", imports],
+    env={"MHS_LOCAL_ROOT": str(sandbox.root / "empty"), "PYTHONPATH": str(config.LOCAL_ROOT)},
+    capture_output=True,
+    text=True,
+  )
+  assert result.returncode == 0, result.stderr
+  assert not (sandbox.root / "empty" / ".env").exists()
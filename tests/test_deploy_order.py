@@ -0,0 +1,51 @@
+"""Fleet-wide deploys respect dependencies and run one service per host at a time."""
+
+import asyncio
+
+from mhs import aio
+from mhs.control.deploy_services.handler import is_deployable, run_in_order
+from mhs.service.entity import Service
+
+
+def test(tmp_path):
+  services = [
+    Service("ingress", 80, depends_on=["immich", "jellyfin"]),
+    Service("immich", 2283),
+    Service("jellyfin", 8096),
+    Service("kopia", 51515, depends_on=["missing"]),
+    Service("broken", 1),
+    Service("after-broken", 2, depends_on=["broken"]),
+  ]
+  hosts = {
+    "ingress": "pi",
+    "immich": "htpc",
+    "jellyfin": "htpc",
+    "kopia": "nas",
+    "broken": "nas",
+    "after-broken": "pi",
+  }
+  active: dict[str, int] = {}
+  finished: list[str] = []
+
+  async def deploy(service: Service):
+    host = hosts[service.key]
+    active[host] = active.get(host, 0) + 1
+    assert active[host] == 1, f"concurrent deploys on {host}"
+    await asyncio.sleep(0.01)
+    active[host] -= 1
+    finished.append(service.key)
+    if service.key == "broken":
+      raise RuntimeError("compose failed")
+
+  failures = aio.run(run_in_order(services, hosts, deploy, jobs=4))
+
+  assert failures == {"broken": "compose failed", "after-broken": "skipped: broken failed"}
+  assert finished.index("ingress") > max(finished.index("immich"), finished.index("jellyfin"))
+  assert "kopia" in finished
+
+  (tmp_path / "immich").mkdir()
+  (tmp_path / "immich" / "docker-compose.yml").write_text("services: {}\n")
+  (tmp_path / "ingress").mkdir()
+  assert is_deployable(Service("immich", 2283), tmp_path)
+  assert not is_deployable(Service("ingress", 80), tmp_path)
+  assert not is_deployable(Service("jellyfin", 8096), tmp_path)
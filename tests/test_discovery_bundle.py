@@ -0,0 +1,68 @@
+"""Rendering of RouterOS discovery bundles."""
+
+from mhs.device.discover import tools
+from mhs.device.discover.entity import DiscoveryScript
+
+
+def test_quote_escapes_and_continues_lines():
+  quoted = tools.quote('a "b" $c\n  d\\e')
+  assert quoted == '"a \\"b\\" \\$c\\\n    \\n  d\\\\e"'
+  # file names are RouterOS literals too, not shell words
+  assert tools.render_import("it's $x.rsc") == (
+    '/import "it\'s \\$x.rsc"; /file remove [find where name="it\'s \\$x.rsc"]'
+  )
+
+
+def test_failures_are_reported_per_script():
+  output = "\n".join(
+    [
+      "=== Discovering a.lan ===",
+      tools.FAILURE_MARKER + " discover-b",
+      "Script file loaded and executed successfully",
+    ]
+  )
+  assert tools.parse_failures(output) == ["discover-b"]
+
+
+def test_installed_digests_require_matching_scheduler():
+  script = DiscoveryScript("discover-a", ":put a", "Discover A (a.lan)", "00:05:00")
+  output = "\n".join(
+    [
+      f"{tools.INSTALLED_MARKER} script|discover-a|{script.comment}",
+      f"{tools.INSTALLED_MARKER} scheduler|discover-a_schedule|{script.comment}",
+      f"{tools.INSTALLED_MARKER} script|discover-b|Discover B (b.lan) [MHS:0123456789ab]",
+    ]
+  )
+  assert tools.parse_installed(output) == {"discover-a": script.digest, "discover-b": ""}
+
+
+def test_one_script_discovers_every_device():
+  source = tools.generate_discovery_script(
+    {"htpc.lan": ["a8:a1:59:f1:3e:b5", "A8:A1:59:F1:3E:B6"], "nas.lan": []}
+  )
+  assert ':set ($devices->"htpc.lan") {"A8:A1:59:F1:3E:B5";"A8:A1:59:F1:3E:B6"}' in source
+  assert ':set ($devices->"nas.lan") [:toarray ""]' in source
+  # the lease and ARP tables are scanned once, not once per device
+  assert source.count("/ip dhcp-server lease find") == 1
+  assert source.count("/ip arp find") == 1
+  # existing records are only replaced when they can't be updated in place
+  assert "/ip dns static remove [find name=" not in source
+  replace = source.index("/ip dns static remove $ids")
+  assert source.rindex("} else={", 0, replace) > source.index("[:len $ids] = 1")
+  # ARP status doesn't exist before RouterOS 7, so reading it must not abort the script
+  [status_line] = [line for line in source.splitlines() if "value-name=status" in line]
+  assert status_line.strip().startswith(":do {") and status_line.strip().endswith("on-error={}")
+
+
+def test_lease_hook_runs_discovery_for_fleet_macs_only():
+  hook = tools.render_lease_hook("discover-fleet", ["A8:A1:59:F1:3E:B5"])
+  assert '[:find {"A8:A1:59:F1:3E:B5"} $leaseActMAC]' in hook
+  assert '/system script run "discover-fleet"' in hook
+
+  commands = tools.render_set_lease_hook(hook)
+  # a DHCP server's own lease-script is left alone, and reported
+  assert tools.quote(tools.LEASE_HOOK_MARKER) in commands
+  output = (
+    f"{tools.LEASE_HOOK_SKIPPED_MARKER} guests\nScript file loaded and executed successfully"
+  )
+  assert tools.parse_skipped_lease_hooks(output) == ["guests"]
@@ -0,0 +1,23 @@
+"""Repeated fleet loads share one parse until the file changes."""
+
+import os
+
+import pytest
+
+from mhs.data.fleet.load.query import LoadFleet
+from tests.conftest import TEST_FLEET_JSON, Sandbox
+
+
+def test(sandbox: Sandbox):
+  fleet_file = sandbox.root / "fleet.json"
+  fleet = LoadFleet(fleet_file).execute()
+  assert LoadFleet(fleet_file).execute() is fleet
+  with pytest.raises(TypeError):
+    fleet.services[sandbox.service_key] = fleet.services[sandbox.service_key]
+
+  sandbox.write("fleet.json", TEST_FLEET_JSON.replace("59999", "59998"))
+  stat = fleet_file.stat()
+  os.utime(fleet_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+  reloaded = LoadFleet(fleet_file).execute()
+  assert reloaded is not fleet
+  assert reloaded.services[sandbox.service_key].port == 59998
@@ -0,0 +1,71 @@
+"""Fleet lookups are answered from indexes built at load time."""
+
+import json
+
+from mhs.data.fleet.load.query import LoadFleet
+from mhs.device.server.entity import Server, ServerRepo
+from mhs.service.entity import ServiceRepo
+from tests.conftest import Sandbox
+
+
+def test(sandbox: Sandbox):
+  fleet = LoadFleet(sandbox.root / "fleet.json").execute()
+  service = fleet.services[sandbox.service_key]
+  assert fleet.get_service_host(service).key == "r-pi"
+  assert [server.key for server in fleet.get_servers_by_mac("b8:27:eb:ab:c0:dc")] == ["r-pi"]
+  assert fleet.get_mounting_servers("mmcblk0p2") == []
+  assert fleet.get_public_hostnames() == []
+
+  fleet_file = sandbox.write(
+    "populated/fleet.json",
+    json.dumps(
+      {
+        "domains": {"main": {"domain": "example.com"}, "alt": {"domain": "example.org"}},
+        "media": {"disk": {"uuid": "1232a209-2596-48f0-a078-731d10b918ad"}},
+        "devices": {
+          "nas": {
+            "macs": ["AA:00:00:00:00:01", "aa:00:00:00:00:02"],
+            "mounts": ["disk"],
+            "services": {
+              "photos": {"port": 2283, "subdomain": "photos", "domain_key": "main"},
+              "files": {"port": 8080, "subdomain": "files", "domain_key": "alt"},
+            },
+          },
+          "htpc": {
+            "macs": ["AA:00:00:00:00:03"],
+            "mounts": ["disk"],
+            "services": {"stream": {"port": 8096, "subdomain": "stream", "domain_key": "main"}},
+          },
+        },
+      }
+    ),
+  )
+  fleet = LoadFleet(fleet_file).execute()
+  assert [server.key for server in fleet.get_mounting_servers("disk")] == ["nas", "htpc"]
+  assert [server.key for server in fleet.get_servers_by_mac("aa:00:00:00:00:01")] == ["nas"]
+  assert [server.key for server in fleet.get_servers_by_mac("AA:00:00:00:00:02")] == ["nas"]
+  assert [server.key for server in fleet.get_servers_by_mac("AA:00:00:00:00:03")] == ["htpc"]
+  assert fleet.get_public_hostnames("main") == ["photos.example.com", "stream.example.com"]
+  assert fleet.get_public_hostnames("alt") == ["files.example.org"]
+  assert sorted(fleet.get_public_hostnames()) == [
+    "files.example.org",
+    "photos.example.com",
+    "stream.example.com",
+  ]
+  assert [(route.hostname, route.upstream_host) for route in fleet.get_routes()] == [
+    ("photos.example.com", "nas.lan"),
+    ("files.example.org", "nas.lan"),
+    ("stream.example.com", "htpc.lan"),
+  ]
+
+  # replacing a server drops the services it no longer hosts
+  servers = ServerRepo()
+  for server in fleet.servers:
+    servers[server.key] = server
+  nas = servers["nas"]
+  photos = fleet.services["photos"]
+  servers["nas"] = Server("nas", "nas.lan", "nas", "", "", "", ServiceRepo())
+  assert servers.get_host(photos) is None
+  assert servers.get_host(fleet.services["stream"]).key == "htpc"
+  servers["htpc"] = Server("htpc", "htpc.lan", "htpc", "", "", "", nas.services)
+  assert servers.get_host(photos).key == "htpc"
@@ -0,0 +1,87 @@
+"""Health checks cover every service endpoint, run concurrently and report latency per check."""
+
+import threading
+import time
+from datetime import UTC, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from mhs import aio
+from mhs.control.check_health.entity import LAN, PUBLIC, Endpoint
+from mhs.control.check_health.handler import build_report, check_all, get_endpoints
+from mhs.data.fleet.load.query import LoadFleet
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+  def do_GET(self):
+    # answers only once every probe is in flight, so sequential checks would fail
+    try:
+      self.server.arrived.wait(timeout=5)
+    except threading.BrokenBarrierError:
+      self.send_error(500)
+      return
+    time.sleep(0.2)
+    status = (
+      503 if self.path == "/" and self.server.server_port == self.server.broken_port else 200
+    )
+    self.send_response(status)
+    self.send_header("Content-Length", "2")
+    self.end_headers()
+    self.wfile.write(b"ok")
+
+  def log_message(self, *args):
+    pass
+
+
+def serve(arrived: threading.Barrier, broken=False) -> ThreadingHTTPServer:
+  server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+  server.arrived = arrived
+  server.broken_port = server.server_port if broken else 0
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  return server
+
+
+def test(sandbox):
+  sandbox.write(
+    "fleet.json",
+    sandbox.read("fleet.json")
+    .replace('"port": 59999', '"port": 59999, "subdomain": "app", "domain_key": "main"')
+    .replace('"media"', '"domains": {"main": {"domain": "example.com"}}, "media"'),
+  )
+  endpoints = get_endpoints(LoadFleet(sandbox.root / "fleet.json").execute())
+  assert [(endpoint.kind, endpoint.url) for endpoint in endpoints] == [
+    (LAN, "http://r-pi.lan:59999/"),
+    (PUBLIC, "http://app.example.com/"),
+  ]
+
+  arrived = threading.Barrier(9)
+  healthy, broken = serve(arrived), serve(arrived, broken=True)
+  try:
+    endpoints = [Endpoint(f"svc{i}", LAN, "127.0.0.1", healthy.server_port) for i in range(8)]
+    endpoints.append(Endpoint("broken", LAN, "127.0.0.1", broken.server_port))
+    endpoints.append(Endpoint("down", LAN, "127.0.0.1", 1))
+
+    started = time.monotonic()
+    results = aio.run(check_all(endpoints, timeout=2, jobs=16))
+    elapsed = time.monotonic() - started
+  finally:
+    healthy.shutdown()
+    broken.shutdown()
+
+  assert [result.ok for result in results] == [True] * 8 + [False, False]
+  assert all(result.latency_ms >= 150 for result in results[:9])
+  assert results[8].status == 503
+  assert results[9].error
+
+  report = build_report(results, datetime.now(UTC), elapsed * 1000)
+  assert report["ok"] is False
+  assert report["checks"][8] | {"latency_ms": 0} == {
+    "service_key": "broken",
+    "kind": LAN,
+    "host": "127.0.0.1",
+    "port": broken.server_port,
+    "url": f"http://127.0.0.1:{broken.server_port}/",
+    "ok": False,
+    "status": 503,
+    "latency_ms": 0,
+    "error": "",
+  }
@@ -0,0 +1,28 @@
+"""Storage is only mounted if the probe shows it attached but not mounted."""
+
+from mhs.device.server.mount_storage.handler import parse_probe, plan_mounts
+from mhs.device.storage.entity import Storage
+
+
+def test():
+  output = "\n".join(
+    [
+      "e290acfa90acd677 ",
+      "448A4A818A4A700A /mnt/my\\x20passport",
+      "",
+      " /boot",
+    ]
+  )
+  mounts = parse_probe(output)
+  assert mounts == {"E290ACFA90ACD677": "", "448A4A818A4A700A": "/mnt/my passport"}
+
+  missing, failures = plan_mounts(
+    [
+      Storage("toshiba14tb", "E290ACFA90ACD677"),
+      Storage("mypassport", "448A4A818A4A700A"),
+      Storage("unplugged", "0000"),
+    ],
+    mounts,
+  )
+  assert [storage.key for storage in missing] == ["toshiba14tb"]
+  assert list(failures) == ["unplugged"]
@@ -0,0 +1,46 @@
+"""Ingress proxies through keepalive upstream pools, with per-service timeouts and caching."""
+
+import json
+
+from mhs.control.service.ingress.render_nginx_config.command import RenderNginxConfig
+
+
+def test(sandbox):
+  fleet = {
+    "domains": {"main": {"domain": "example.com"}},
+    "devices": {
+      "htpc": {
+        "macs": ["A8:A1:59:F1:3E:B5"],
+        "services": {
+          "immich": {
+            "port": 2283,
+            "subdomain": "photos",
+            "domain_key": "main",
+            "proxy_timeout": 600,
+            "cache_paths": ["~ ^/api/assets/[^/]+/thumbnail$"],
+          },
+          "jellyfin": {"port": 8096, "subdomain": "stream", "domain_key": "main"},
+          "private": {"port": 9000},
+        },
+      },
+    },
+  }
+  fleet_file = sandbox.write("fleet.json", json.dumps(fleet))
+  output = sandbox.root / ".temp" / "ingress-nginx.conf"
+
+  config = RenderNginxConfig(fleet_file, output=output).execute()
+  assert output.read_text() == config
+  assert "resolver" not in config and "$backend" not in config
+
+  photos, stream = config.split("\nupstream ")[1:]
+  assert photos.startswith("mhs_immich {\n\tserver htpc.lan:2283;\n\tkeepalive 16;\n}")
+  assert "server_name photos.example.com;" in photos
+  assert "proxy_read_timeout 600s;" in photos
+  assert "location ~ ^/api/assets/[^/]+/thumbnail$ {" in photos
+  assert "proxy_cache mhs_ingress;" in photos
+  assert "proxy_set_header Connection $mhs_connection;" in photos
+
+  assert stream.startswith("mhs_jellyfin {\n\tserver htpc.lan:8096;")
+  assert "proxy_read_timeout 86400s;" in stream
+  assert "proxy_cache " not in stream
+  assert "private" not in config
@@ -0,0 +1,50 @@
+"""Pulling from a remote keeps newer local files, and tells missing files from real errors."""
+
+import io
+import os
+import tarfile
+import time
+
+from mhs.control.execute_service_script.handler import extract_newer, only_missing_files
+
+
+def make_archive(files: dict[str, str], mtime: float) -> io.BytesIO:
+  stream = io.BytesIO()
+  with tarfile.open(fileobj=stream, mode="w") as archive:
+    for name, content in files.items():
+      info = tarfile.TarInfo(name)
+      info.size = len(content.encode())
+      info.mtime = int(mtime)
+      archive.addfile(info, io.BytesIO(content.encode()))
+  stream.seek(0)
+  return stream
+
+
+def test(tmp_path):
+  now = time.time()
+  edited = tmp_path / "etc/svc/.env"
+  edited.parent.mkdir(parents=True)
+  edited.write_text("LOCAL_EDIT=1\n")
+  stale = tmp_path / "etc/svc/state.json"
+  stale.write_text("{}")
+  os.utime(stale, (now - 3600, now - 3600))
+
+  remote = {"etc/svc/.env": "REMOTE=1\n", "etc/svc/state.json": '{"a": 1}', "etc/svc/new": "x"}
+  with tarfile.open(fileobj=make_archive(remote, now - 60), mode="r|") as archive:
+    extracted = extract_newer(archive, tmp_path)
+
+  assert extracted == ["etc/svc/state.json", "etc/svc/new"]
+  assert edited.read_text() == "LOCAL_EDIT=1\n"
+  assert stale.read_text() == '{"a": 1}'
+  assert (tmp_path / "etc/svc/new").read_text() == "x"
+
+  assert only_missing_files(
+    "tar: etc/svc/.env: Cannot stat: No such file or directory\n"
+    "tar: Exiting with failure status due to previous errors\n"
+  )
+  assert only_missing_files(
+    "tar.exe: etc/svc/.env: Couldn't find file: No such file or directory\r\n"
+    "tar.exe: Error exit delayed from previous errors.\r\n"
+  )
+  assert not only_missing_files("ssh: connect to host nas port 22: Connection refused\n")
+  assert not only_missing_files("Permission denied (publickey).\n")
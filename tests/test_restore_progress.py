@@ -0,0 +1,25 @@
+"""Restore throughput is timed from when the remote reads, not from filling local buffers."""
+
+from mhs.control.service.immich.restore_backup import handler
+from mhs.control.service.immich.restore_backup.handler import TransferProgress
+
+
+def test(monkeypatch):
+  now = 100.0
+  monkeypatch.setattr(handler.time, "monotonic", lambda: now)
+  progress = TransferProgress(total=10, buffered=4)
+
+  # buffered writes return at once, however long the remote then waits for Postgres
+  progress.update(2)
+  progress.update(2)
+  assert not progress.started and progress.rate == 0.0
+  assert str(progress) == "Sent 4.0 B / 10.0 B (40%)"
+
+  now = 130.0
+  progress.update(2)
+  assert progress.started == 130.0 and progress.timed_from == 6
+
+  now = 132.0
+  progress.update(2)
+  assert progress.rate == 1.0
+  assert str(progress).endswith("(80%) at 1.0 B/s, ETA 0m02s")
@@ -0,0 +1,35 @@
+"""The ingress routing table is resolved from the fleet in one pass, ready for bash to read."""
+
+import json
+
+from mhs.data.fleet.resolve_routes.query import ResolveRoutes
+from mhs.service.entity import Route
+
+
+def test(sandbox):
+  fleet = {
+    "domains": {"main": {"domain": "example.com"}, "unused": {}},
+    "devices": {
+      "pi": {
+        "macs": ["B8:27:EB:AB:C0:DC"],
+        "services": {"ingress": {"port": 80}},
+      },
+      "htpc": {
+        "macs": ["A8:A1:59:F1:3E:B5"],
+        "services": {
+          "immich": {"port": 2283, "subdomain": "photos", "domain_key": "main"},
+          "private": {"port": 9000},
+          "orphan": {"port": 9001, "subdomain": "x", "domain_key": "unused"},
+        },
+      },
+    },
+  }
+  fleet_file = sandbox.write("fleet.json", json.dumps(fleet))
+  routes_file = sandbox.root / ".temp" / "routes.txt"
+
+  routes = ResolveRoutes(fleet_file, output=routes_file).execute()
+  assert routes == [Route("photos.example.com", "immich", "htpc.lan", 2283)]
+  assert routes_file.read_text() == "photos.example.com|htpc.lan|2283|immich\n"
+
+  result = sandbox.run("bash", "-c", f"IFS='|' read -r a b c d < {routes_file}; echo $b:$c")
+  assert result.stdout == "htpc.lan:2283\n"
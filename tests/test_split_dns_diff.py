@@ -0,0 +1,22 @@
+"""Split DNS changes are computed from a single read of the router's static entries."""
+
+from mhs.control.sync_split_dns.handler import diff_entries
+
+
+def test():
+  actual = [
+    ("ingress.lan", "192.168.1.10"),
+    ("photos.example.com", "192.168.1.10"),
+    ("stream.example.com", "192.168.1.99"),
+    ("old.example.com", "192.168.1.10"),
+    ("unrelated.org", "1.2.3.4"),
+  ]
+  desired = {
+    "photos.example.com": "192.168.1.10",
+    "stream.example.com": "192.168.1.10",
+    "backup.example.com": "192.168.1.10",
+  }
+  adds, updates, removes = diff_entries(desired, actual, ["example.com"])
+  assert adds == {"backup.example.com": "192.168.1.10"}
+  assert updates == {"stream.example.com": "192.168.1.10"}
+  assert removes == {"old.example.com"}
@@ -0,0 +1,34 @@
+"""A shared SSH master is reused while its socket exists and reopened once it has exited."""
+
+from pathlib import Path
+
+from mhs.ssh import pool
+
+
+def test(tmp_path, monkeypatch):
+  started: list[tuple[str, str]] = []
+
+  def start_master(ssh_host, identity_file, control_path):
+    started.append((ssh_host, identity_file))
+    Path(control_path).touch()
+    return True
+
+  monkeypatch.setattr(pool, "SSH_MULTIPLEX", True)
+  monkeypatch.setattr(pool, "_masters", {})
+  monkeypatch.setattr(pool, "_control_dir", tmp_path)
+  monkeypatch.setattr(pool, "_start_master", start_master)
+
+  options = pool.ssh_options("nas")
+  assert pool.ssh_options("nas") == options
+  assert started == [("nas", "")]
+
+  Path(options[-1].removeprefix("ControlPath=")).unlink()  # the master exited
+  assert pool.ssh_options("nas") == options
+  assert started == [("nas", ""), ("nas", "")]
+
+  # a different identity gets its own master, started with that identity
+  assert pool.ssh_options("nas", "~/.ssh/backup") != options
+  assert started[-1] == ("nas", "~/.ssh/backup")
+
+  monkeypatch.setattr(pool, "_start_master", lambda *args: False)
+  assert pool.ssh_options("htpc") == []
@@ -0,0 +1,61 @@
+"""Syncing pushes only files changed since the last push, and a full sync refreshes the record."""
+
+import hashlib
+import json
+
+from mhs.control.execute_service_script import handler
+from mhs.control.execute_service_script.handler import (
+  bidirectional_sync,
+  hash_files,
+  load_manifest,
+)
+from mhs.device.server.entity import Server
+from mhs.service.entity import ServiceRepo
+
+
+def test(tmp_path, monkeypatch):
+  (tmp_path / ".env").write_text("A=1\n")
+  (tmp_path / "fleet.json").write_text("{}")
+  files = [".env", "fleet.json", "gone.txt"]
+
+  hashes = hash_files(files, tmp_path)
+  assert hashes == {
+    ".env": hashlib.sha256(b"A=1\n").hexdigest(),
+    "fleet.json": hashlib.sha256(b"{}").hexdigest(),
+    "gone.txt": "",
+  }
+
+  manifest_file = tmp_path / ".temp" / "sync-nas.json"
+  assert load_manifest(manifest_file) == {}
+  manifest_file.parent.mkdir()
+  manifest_file.write_text("not json")
+  assert load_manifest(manifest_file) == {}
+
+  pushed: list[list[str]] = []
+
+  def run_rsync(cmd, root_dir, operation, debug, allow_missing=False):
+    pushed.append((root_dir / cmd[cmd.index("--files-from") + 1]).read_text().splitlines())
+    return True
+
+  monkeypatch.setattr(handler, "run_rsync", run_rsync)
+  server = Server("nas", "nas.lan", "nas", "", "", "", ServiceRepo())
+
+  def sync(full_sync=False) -> list[str]:
+    pushed.clear()
+    assert bidirectional_sync(
+      server, [], files, "svc", tmp_path, manifest_file=manifest_file, full_sync=full_sync
+    )
+    return pushed[0] if pushed else []
+
+  assert sync() == files
+  assert load_manifest(manifest_file) == hashes
+  assert sync() == ["gone.txt"]  # missing files are always pushed, so --delete removes them
+
+  (tmp_path / ".env").write_text("A=2\n")
+  assert sync() == [".env", "gone.txt"]
+
+  # a full sync pushes everything and still records what it pushed
+  manifest_file.write_text(json.dumps({".env": "stale"}))
+  assert sync(full_sync=True) == files
+  assert load_manifest(manifest_file)[".env"] == hashlib.sha256(b"A=2\n").hexdigest()
+  assert sync() == ["gone.txt"]
@@ -0,0 +1,60 @@
+"""Traced executions and spawned processes nest as spans and export as a Chrome trace."""
+
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+from mhs import aio, trace
+
+
+@dataclass
+class Outer:
+  @trace.traced
+  def execute(self):
+    script = "import sys; sys.stdout.buffer.write('héllo\\n'.encode())"
+    trace.run(
+      [sys.executable, "-c", script], capture_output=True, text=True, encoding="utf-8", check=True
+    )
+    return aio.run(aio.gather([Inner().aexecute(), Inner().aexecute()]))
+
+
+@dataclass
+class Inner:
+  @trace.traced
+  async def aexecute(self):
+    return 1
+
+
+def test(monkeypatch):
+  monkeypatch.setattr(trace, "TRACE", "1")
+  monkeypatch.setattr(trace, "_roots", [])
+
+  assert Outer().execute() == [1, 1]
+
+  [root] = trace._roots
+  assert root.name == "Outer.execute"
+  assert [child.name for child in root.children] == [
+    Path(sys.executable).name,
+    "Inner.aexecute",
+    "Inner.aexecute",
+  ]
+  process = root.children[0]
+  assert process.attrs["exit_code"] == 0
+  assert process.attrs["bytes_in"] == len("héllo\n".encode())
+  assert root.duration_ms >= process.duration_ms > 0
+
+  lines = trace.format_tree(trace._roots)
+  assert lines[0].endswith("Outer.execute  target=Outer()")
+  assert "exit_code=0 bytes_in=7" in lines[1]
+
+  events = trace.to_chrome_trace(trace._roots)["traceEvents"]
+  assert [event["ph"] for event in events] == ["M", "X", "X", "X", "X"]
+  assert {event["tid"] for event in events} == {1}
+
+  # disabled, nothing is recorded and targets and command lines are never built
+  monkeypatch.setattr(trace, "TRACE", "")
+  monkeypatch.setattr(trace, "_roots", [])
+  monkeypatch.setattr(trace, "_target", lambda instance: 1 / 0)
+  monkeypatch.setattr(trace.shlex, "join", lambda args: 1 / 0)
+  assert Outer().execute() == [1, 1]
+  assert trace._roots == []